@@ -9,8 +9,11 @@ c.setFont("Helvetica-Bold", 16)
 c.drawString(100, 750, "TechCorp Annual Report 2024")
 
 # Add content
-c.setFont("Helvetica", 12)
-y_position = 700
+# WHY ONE TEXT OBJECT? All lines go into a single text block
+# instead of one drawString call (and block) per line
+text = c.beginText(100, 700)
+text.setFont("Helvetica", 12)
+text.setLeading(20)
 
 content = [
     "",
@@ -30,9 +33,9 @@ content = [
     "CTO: Raj Kumar"
 ]
 
-for line in content:
-    c.drawString(100, y_position, line)
-    y_position -= 20
+# trim=0 keeps the indentation of the product list
+text.textLines(content, trim=0)
+c.drawText(text)
 
 c.save()
 print("✅ PDF created: data/pdfs/company_report.pdf")
\ No newline at end of file
@@ -25,6 +25,10 @@ import os
 from dotenv import load_dotenv
 import tempfile
 import shutil
+import pandas as pd
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import time
 # Load environment - works both locally and on Streamlit Cloud
 # WHY? Streamlit Cloud uses secrets, local uses .env
 try:
@@ -45,9 +49,24 @@ sys.path.insert(0, str(project_root))
 # Load environment
 load_dotenv()
 
-# Import our modules
-from src.ingestion.unified_manager import UnifiedIngestionManager
-from src.retrieval.advanced_query_engine import AdvancedQueryEngine
+# Our modules are imported where they are first needed
+# WHY? The query engine pulls in OpenAI, FAISS and BM25 - no reason
+# to load them before the user builds a knowledge base
+
+# Saved indexes, one folder per distinct set of sources
+# WHY? Rebuilding with the same files/URLs loads from disk instead
+INDEX_CACHE_DIR = Path("storage_streamlit")
+MAX_CACHED_INDEXES = 4
+
+# RAM-backed (tmpfs) scratch space for uploads, when the host has one
+# WHY? Uploads are written once and read straight back by the ingesters
+SHM_UPLOAD_DIR = Path("/dev/shm/rag_uploads")
+
+# How many recent chat exchanges are drawn on every rerun
+MAX_VISIBLE_CHATS = 20
+
+# How much of each source chunk is shown under an answer
+SOURCE_PREVIEW_CHARS = 500
 
 # Page configuration
 # WHY? Sets browser tab title, icon, layout
@@ -60,7 +79,7 @@ st.set_page_config(
 
 # Custom CSS for better styling
 # WHY? Make it look professional!
-st.markdown("""
+CUSTOM_CSS = """
     <style>
     .main {
         padding: 0rem 1rem;
@@ -75,7 +94,7 @@ st.markdown("""
         margin: 0.5rem 0;
     }
     </style>
-""", unsafe_allow_html=True)
+"""
 
 
 def init_session_state():
@@ -94,6 +113,7 @@ def init_session_state():
     - indexed: Whether index is built
     """
     if 'ingestion_manager' not in st.session_state:
+        from src.ingestion.unified_manager import UnifiedIngestionManager
         st.session_state.ingestion_manager = UnifiedIngestionManager()
     
     if 'query_engine' not in st.session_state:
@@ -118,6 +138,10 @@ def save_uploaded_file(uploaded_file, target_dir):
     - Our ingesters need files on disk
     - Save temporarily, then process
     
+    WHY COPY IN CHUNKS?
+    - Large PDFs would otherwise be copied into memory in one go
+    - 1 MiB at a time keeps memory flat regardless of file size
+    
     Parameters:
     - uploaded_file: Streamlit UploadedFile object
     - target_dir: Where to save
@@ -127,12 +151,265 @@ def save_uploaded_file(uploaded_file, target_dir):
     target_path = Path(target_dir) / uploaded_file.name
     target_path.parent.mkdir(parents=True, exist_ok=True)
     
+    # Rewind first - the file may have been read already in this rerun
+    uploaded_file.seek(0)
     with open(target_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+        shutil.copyfileobj(uploaded_file, f, length=1 << 20)
     
     return target_path
 
 
+def get_upload_root(total_bytes: int):
+    """
+    Pick where uploaded files are saved before ingestion
+    
+    WHY?
+    - /dev/shm is RAM, so the save + re-read skips the disk
+    - But RAM is limited: only use it when the upload fits
+      comfortably (under half of the free space)
+    
+    Parameters:
+    - total_bytes: Combined size of the files about to be saved
+    
+    Returns: Directory to create the temp folder in
+             (None = the system default temp location)
+    """
+    shm = SHM_UPLOAD_DIR.parent
+    if not (shm.is_dir() and os.access(shm, os.W_OK)):
+        return None
+    
+    if total_bytes > shutil.disk_usage(shm).free // 2:
+        return None
+    
+    SHM_UPLOAD_DIR.mkdir(exist_ok=True)
+    return str(SHM_UPLOAD_DIR)
+
+
+def get_upload_dir(total_bytes: int) -> str:
+    """
+    Get this session's upload directory, emptied for a new build
+    
+    WHY REUSE IT?
+    - A fresh temp folder per build piles up until the app exits
+    - One folder per session is enough: old uploads are deleted
+      before the new ones are saved
+    
+    Parameters:
+    - total_bytes: Combined size of the files about to be saved
+    
+    Returns: Path to an empty directory
+    """
+    root = get_upload_root(total_bytes)
+    temp_dir = st.session_state.get('upload_dir')
+    
+    # Move the folder if this upload belongs somewhere else (RAM vs disk)
+    if temp_dir and Path(temp_dir).parent != Path(root or tempfile.gettempdir()):
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        temp_dir = None
+    
+    if temp_dir and Path(temp_dir).exists():
+        for path in Path(temp_dir).iterdir():
+            path.unlink()
+    else:
+        temp_dir = tempfile.mkdtemp(dir=root)
+        st.session_state.upload_dir = temp_dir
+        st.session_state.temp_dirs.append(temp_dir)
+    
+    return temp_dir
+
+
+def compute_inputs_signature(uploaded_files, urls) -> str:
+    """
+    Fingerprint the sources of a build
+    
+    WHY?
+    - Identical uploads + URLs produce an identical index
+    - The fingerprint names the folder the index is saved in,
+      so a repeat build can load it instead of re-embedding
+    
+    HOW:
+    SHA-256 over sorted (filename, content hash) pairs, then the URLs
+    
+    Returns: Short hex string (safe as a folder name)
+    """
+    digest = hashlib.sha256()
+    
+    for uploaded_file in sorted(uploaded_files, key=lambda f: f.name):
+        digest.update(uploaded_file.name.encode())
+        digest.update(hashlib.sha256(uploaded_file.getbuffer()).digest())
+    
+    for url in urls:
+        digest.update(url.encode())
+    
+    return digest.hexdigest()[:16]
+
+
+def prune_index_cache(keep: int = MAX_CACHED_INDEXES):
+    """
+    Delete all but the most recently used saved indexes
+    
+    WHY?
+    - Every distinct set of sources gets its own folder
+    - Without a cap, disk usage grows with every new upload
+    """
+    if not INDEX_CACHE_DIR.exists():
+        return
+    
+    cached = sorted(
+        (p for p in INDEX_CACHE_DIR.iterdir() if p.is_dir()),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True
+    )
+    for old_dir in cached[keep:]:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def wait_with_progress(futures, status, label: str):
+    """
+    Wait for background work while keeping the UI alive
+    
+    WHY?
+    - The heavy work (parsing, scraping, embedding) runs in threads
+    - Streamlit can only be updated from the script thread
+    - So the script thread polls twice a second and refreshes a
+      status line with the elapsed time
+    
+    Parameters:
+    - futures: Futures to wait for
+    - status: st.empty() placeholder for the status line
+    - label: What is running (shown to the user)
+    
+    Yields: Each future as soon as it completes
+    """
+    start = time.time()
+    pending = set(futures)
+    
+    while pending:
+        done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+        status.info(f"⏳ {label}... {time.time() - start:.0f}s")
+        yield from done
+    
+    status.empty()
+
+
+def build_knowledge_base(uploaded_files, url_input):
+    """
+    Ingest the uploaded files and URLs, then build the index
+    
+    WHY SEPARATE FUNCTION?
+    - Keeps the sidebar layout readable
+    - Early returns only leave the build, the sidebar keeps rendering
+    
+    Parameters:
+    - uploaded_files: Files from the sidebar uploader
+    - url_input: Raw text from the URL box (one URL per line)
+    """
+    from src.retrieval.advanced_query_engine import AdvancedQueryEngine
+    
+    # IMPORTANT: Clear old data but keep the same manager
+    # WHY? Its ingesters are reused across builds instead of rebuilt
+    st.session_state.ingestion_manager.clear()
+    
+    # Only PDFs and CSVs are ingested
+    files = [
+        uploaded_file for uploaded_file in uploaded_files or []
+        if uploaded_file.name.endswith(('.pdf', '.csv'))
+    ]
+    
+    # Parse URLs
+    urls = []
+    if url_input.strip():
+        urls = [url.strip() for url in url_input.strip().split('\n') if url.strip()]
+        st.sidebar.info(f"🌐 Found {len(urls)} URL(s) to process")
+    
+    # IMPORTANT: Only process what user uploaded/entered
+    if not files and not urls:
+        st.sidebar.warning("⚠️ Please upload files or add URLs first!")
+        return
+    
+    # Same files + same URLs = same index
+    # WHY? Reload it from disk instead of re-parsing and re-embedding
+    storage_dir = INDEX_CACHE_DIR / compute_inputs_signature(files, urls)
+    if (storage_dir / "docstore.json").exists():
+        st.sidebar.info("♻️ Same sources as a previous build - loading saved index...")
+        st.session_state.query_engine = AdvancedQueryEngine(storage_dir=str(storage_dir))
+        st.session_state.query_engine.load_or_create_index()
+        st.session_state.indexed = True
+        storage_dir.touch()
+        st.sidebar.success("✅ Knowledge base loaded from cache!")
+        return
+    
+    # One temporary directory for all uploads, reused across builds
+    # WHY ONE? The PDF ingester only reads *.pdf and the CSV ingester only *.csv
+    temp_dir = get_upload_dir(sum(f.size for f in files))
+    
+    # Process uploaded files
+    # WHY A THREAD POOL? Saving is disk-bound and files don't depend on each other
+    if files:
+        st.sidebar.info(f"📤 Processing {len(uploaded_files)} uploaded file(s)...")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda uploaded_file: save_uploaded_file(uploaded_file, temp_dir), files))
+        for uploaded_file in files:
+            st.sidebar.success(f"✓ Saved: {uploaded_file.name}")
+    
+    # Track what we're processing
+    pdf_count = sum(1 for uploaded_file in files if uploaded_file.name.endswith('.pdf'))
+    csv_count = len(files) - pdf_count
+    
+    st.sidebar.info(f"📊 Processing: {pdf_count} PDFs, {csv_count} CSVs, {len(urls)} URLs")
+    
+    # Ingest PDFs, CSVs and URLs in parallel (uploaded/entered ONLY)
+    # WHY? The three sources are independent - build time becomes
+    # the slowest source instead of the sum of all three
+    manager = st.session_state.ingestion_manager
+    status = st.sidebar.empty()
+    jobs = {}
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        if pdf_count > 0:
+            st.sidebar.info("📄 Reading PDFs...")
+            jobs[executor.submit(manager.add_pdfs, temp_dir)] = "PDF chunks"
+        if csv_count > 0:
+            st.sidebar.info("📊 Reading CSVs...")
+            jobs[executor.submit(manager.add_csvs, temp_dir)] = "CSV rows"
+        if urls:
+            st.sidebar.info("🌐 Scraping websites...")
+            jobs[executor.submit(manager.add_urls, urls)] = "web pages"
+        
+        # Report each source as soon as it finishes
+        # WHY HERE? Streamlit calls must stay on the script thread
+        for future in wait_with_progress(jobs, status, "Ingesting sources"):
+            st.sidebar.success(f"✓ Added {future.result()} {jobs[future]}")
+    
+    # Get all documents
+    documents = st.session_state.ingestion_manager.get_documents()
+    
+    if len(documents) == 0:
+        st.sidebar.error("❌ No content extracted. Please check your files/URLs.")
+        return
+    
+    st.sidebar.info(f"📚 Total: {len(documents)} documents")
+    
+    # Show sample of what was indexed
+    st.sidebar.info("📝 Sample from first document:")
+    st.sidebar.code(documents[0].text[:200] + "...")
+    
+    # Build index
+    st.sidebar.info("🔨 Building vector index (this may take a minute)...")
+    st.session_state.query_engine = AdvancedQueryEngine(storage_dir=str(storage_dir))
+    
+    # Embed in a worker thread so the status line keeps updating
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(st.session_state.query_engine.load_or_create_index, documents)
+        for done in wait_with_progress([future], status, "Building vector index"):
+            done.result()
+    
+    st.session_state.indexed = True
+    prune_index_cache()
+    
+    st.sidebar.success(f"✅ Knowledge base built with {len(documents)} documents!")
+    st.balloons()
+
+
 def sidebar_data_ingestion():
     """
     Sidebar for data ingestion
@@ -173,87 +450,8 @@ def sidebar_data_ingestion():
     st.sidebar.markdown("---")
     
     if st.sidebar.button("🔨 Build Knowledge Base", type="primary", use_container_width=True):
-     with st.spinner("Building knowledge base..."):
         try:
-            # IMPORTANT: Create a NEW ingestion manager to clear old data
-            st.session_state.ingestion_manager = UnifiedIngestionManager()
-            
-            # Create temporary directories
-            temp_pdf_dir = tempfile.mkdtemp()
-            temp_csv_dir = tempfile.mkdtemp()
-            st.session_state.temp_dirs.extend([temp_pdf_dir, temp_csv_dir])
-            
-            # Track what we're processing
-            pdf_count = 0
-            csv_count = 0
-            
-            # Process uploaded files
-            if uploaded_files:
-                st.sidebar.info(f"📤 Processing {len(uploaded_files)} uploaded file(s)...")
-                for uploaded_file in uploaded_files:
-                    if uploaded_file.name.endswith('.pdf'):
-                        file_path = save_uploaded_file(uploaded_file, temp_pdf_dir)
-                        pdf_count += 1
-                        st.sidebar.success(f"✓ Saved: {uploaded_file.name}")
-                    elif uploaded_file.name.endswith('.csv'):
-                        file_path = save_uploaded_file(uploaded_file, temp_csv_dir)
-                        csv_count += 1
-                        st.sidebar.success(f"✓ Saved: {uploaded_file.name}")
-            
-            # Parse URLs
-            urls = []
-            if url_input.strip():
-                urls = [url.strip() for url in url_input.strip().split('\n') if url.strip()]
-                st.sidebar.info(f"🌐 Found {len(urls)} URL(s) to process")
-            
-            # IMPORTANT: Only process what user uploaded/entered
-            total_items = pdf_count + csv_count + len(urls)
-            
-            if total_items == 0:
-                st.sidebar.warning("⚠️ Please upload files or add URLs first!")
-                return
-            
-            st.sidebar.info(f"📊 Processing: {pdf_count} PDFs, {csv_count} CSVs, {len(urls)} URLs")
-            
-            # Ingest PDFs from uploaded files ONLY
-            if pdf_count > 0:
-                st.sidebar.info("📄 Reading PDFs...")
-                added = st.session_state.ingestion_manager.add_pdfs(temp_pdf_dir)
-                st.sidebar.success(f"✓ Added {added} PDF chunks")
-            
-            # Ingest CSVs from uploaded files ONLY
-            if csv_count > 0:
-                st.sidebar.info("📊 Reading CSVs...")
-                added = st.session_state.ingestion_manager.add_csvs(temp_csv_dir)
-                st.sidebar.success(f"✓ Added {added} CSV rows")
-            
-            # Ingest URLs
-            if urls:
-                st.sidebar.info("🌐 Scraping websites...")
-                added = st.session_state.ingestion_manager.add_urls(urls)
-                st.sidebar.success(f"✓ Added {added} web pages")
-            
-            # Get all documents
-            documents = st.session_state.ingestion_manager.get_documents()
-            
-            if len(documents) == 0:
-                st.sidebar.error("❌ No content extracted. Please check your files/URLs.")
-                return
-            
-            st.sidebar.info(f"📚 Total: {len(documents)} documents")
-            
-            # Show sample of what was indexed
-            st.sidebar.info("📝 Sample from first document:")
-            st.sidebar.code(documents[0].text[:200] + "...")
-            
-            # Build index
-            st.sidebar.info("🔨 Building vector index (this may take a minute)...")
-            st.session_state.query_engine = AdvancedQueryEngine(storage_dir="storage_streamlit")
-            st.session_state.query_engine.load_or_create_index(documents)
-            st.session_state.indexed = True
-            
-            st.sidebar.success(f"✅ Knowledge base built with {len(documents)} documents!")
-            st.balloons()
+            build_knowledge_base(uploaded_files, url_input)
             
         except Exception as e:
             st.sidebar.error(f"❌ Error: {str(e)}")
@@ -268,6 +466,11 @@ def sidebar_data_ingestion():
         
         stats = st.session_state.ingestion_manager.get_statistics()
         
+        # Loaded from a cached index - nothing was ingested this session
+        if stats['total_documents'] == 0:
+            st.sidebar.metric("Indexed Chunks", len(st.session_state.query_engine.nodes))
+            return
+        
         col1, col2 = st.sidebar.columns(2)
         with col1:
             st.metric("Total Docs", stats['total_documents'])
@@ -281,6 +484,48 @@ def sidebar_data_ingestion():
                 st.sidebar.write(f"• {source.upper()}: {count}")
 
 
+def render_chat_exchange(chat: dict):
+    """
+    Display one question/answer pair from the chat history
+    
+    WHY st.chat_message?
+    - Built-in chat bubbles with user/assistant avatars
+    - Each exchange is a self-contained block
+    
+    Parameters:
+    - chat: Chat history entry (question, answer, mode, sources, time)
+    """
+    # Question
+    with st.chat_message("user"):
+        st.markdown(chat['question'])
+        st.caption(f"Mode: {chat['mode'].upper()} | Time: {chat['time']:.2f}s")
+    
+    # Answer
+    with st.chat_message("assistant"):
+        st.markdown(chat['answer'])
+        
+        # Sources
+        # WHY ONE TABLE? A single element instead of three per source
+        if chat['sources']:
+            with st.expander(f"📚 View {len(chat['sources'])} source(s)"):
+                rows = [
+                    {
+                        'id': source['id'],
+                        'source': (
+                            source['metadata'].get('filename') or
+                            source['metadata'].get('url') or
+                            source['metadata'].get('source_file') or
+                            'Unknown'
+                        ),
+                        'score': source['score'],
+                        'text': source['text'][:SOURCE_PREVIEW_CHARS]
+                    }
+                    for source in chat['sources']
+                ]
+                st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+
+
+@st.fragment
 def main_chat_interface():
     """
     Main chat interface
@@ -290,6 +535,10 @@ def main_chat_interface():
     - Shows conversation history
     - Familiar to users (like ChatGPT)
     
+    WHY A FRAGMENT?
+    - Asking a question only reruns this function
+    - The sidebar (uploads, statistics) is not re-executed per question
+    
     FEATURES:
     - Question input
     - Retrieval mode selector
@@ -376,35 +625,19 @@ def main_chat_interface():
         st.markdown("---")
         st.subheader("💬 Conversation History")
         
-        # Display in reverse order (newest first)
-        for i, chat in enumerate(reversed(st.session_state.chat_history)):
-            with st.container():
-                # Question
-                st.markdown(f"**❓ Question:** {chat['question']}")
-                st.markdown(f"*Mode: {chat['mode'].upper()} | Time: {chat['time']:.2f}s*")
-                
-                # Answer
-                st.markdown(f"**🤖 Answer:**")
-                st.info(chat['answer'])
-                
-                # Sources
-                if chat['sources']:
-                    with st.expander(f"📚 View {len(chat['sources'])} source(s)"):
-                        for source in chat['sources']:
-                            source_name = (
-                                source['metadata'].get('filename') or
-                                source['metadata'].get('url') or
-                                source['metadata'].get('source_file') or
-                                'Unknown'
-                            )
-                            
-                            score_text = f" (Score: {source['score']:.3f})" if source['score'] else ""
-                            
-                            st.markdown(f"**Source {source['id']}: {source_name}**{score_text}")
-                            st.text(source['text'])
-                            st.markdown("---")
-                
-                st.markdown("---")
+        history = st.session_state.chat_history
+        
+        # Display in reverse order (newest first), only the recent exchanges
+        # WHY? Redrawing every old answer on each rerun slows long chats down
+        for chat in reversed(history[-MAX_VISIBLE_CHATS:]):
+            render_chat_exchange(chat)
+        
+        # Older exchanges are only drawn on request
+        # WHY A TOGGLE? An expander still renders its contents when collapsed
+        older = history[:-MAX_VISIBLE_CHATS]
+        if older and st.toggle(f"Show {len(older)} earlier exchange(s)"):
+            for chat in reversed(older):
+                render_chat_exchange(chat)
         
         # Clear history button
         if st.button("🗑️ Clear History"):
@@ -440,6 +673,11 @@ def main():
     # Initialize
     init_session_state()
     
+    # Inject styling
+    # WHY EVERY RUN? Streamlit removes elements a rerun doesn't redraw
+    # WHY st.html? A style-only block is sent without a markdown pass
+    st.html(CUSTOM_CSS)
+    
     # Layout
     sidebar_data_ingestion()
     main_chat_interface()
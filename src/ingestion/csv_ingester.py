@@ -19,15 +19,60 @@ Converted: "Priya is the CEO with a salary of 200000"
 """
 
 import pandas as pd
-from typing import List, Dict, Optional
+import charset_normalizer
+import pyarrow as pa
+import pyarrow.compute as pc
+from typing import Iterator, List, Dict, Optional
 from llama_index.core import Document
 from pathlib import Path
 import logging
 from datetime import datetime
 
+# Import the shared folder scan
+# (project root added only when run as a script)
+import sys
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.ingestion.file_scanner import scan_directory
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rows read to work out column types in get_schema_info()
+SCHEMA_SAMPLE_ROWS = 1000
+
+
+def detect_encoding(file_path) -> str:
+    """
+    Guess a CSV's text encoding from a few samples of the file
+    
+    WHY?
+    - Reading as UTF-8 and retrying as latin1 on failure parses
+      non-UTF-8 files twice
+    - charset_normalizer looks at 5 samples (64 KB each) spread
+      over the file, so the right encoding is used on the first pass
+    
+    WHY ONLY TRUST UTF GUESSES?
+    - On short files the guesses between single-byte code pages
+      are unreliable (latin1 text is often reported as cp1250)
+    - latin1 decodes every byte and is what we always fell back to
+    
+    Returns: Encoding name for pd.read_csv
+    """
+    best = charset_normalizer.from_path(file_path, steps=5, chunk_size=64 * 1024).best()
+    
+    if best is None:
+        return 'latin1'
+    
+    if best.encoding in ('ascii', 'utf_8'):
+        return 'utf-8'
+    
+    if best.encoding.startswith('utf'):
+        return best.encoding
+    
+    return 'latin1'
+
 
 class CSVIngester:
     """
@@ -39,21 +84,42 @@ class CSVIngester:
     - Easy to extend for SQL databases later
     """
     
-    def __init__(self, text_columns: Optional[List[str]] = None):
+    def __init__(
+        self,
+        text_columns: Optional[List[str]] = None,
+        chunk_rows: int = 50_000,
+        cache_dataframes: bool = False,
+        include_row_data: bool = False
+    ):
         """
         Initialize CSV ingester
         
         Parameters:
         - text_columns: Specific columns to focus on (optional)
           WHY? Some columns are more important (description vs id)
+        - chunk_rows: Rows read per batch during ingestion (default 50,000)
+          WHY? Large CSVs are never fully loaded - memory is bounded by one batch
+        - cache_dataframes: Keep every CSV loaded with load_csv() in self.dataframes
+          WHY OFF BY DEFAULT? Nothing reads the cache back, and it would keep
+          every loaded CSV in memory for as long as the ingester lives
+        - include_row_data: Copy every row's values (and the column list) into
+          its Document's metadata
+          WHY OFF BY DEFAULT? Citations only need source_file + row_number,
+          and a dict per row adds up to the whole CSV held in memory again.
+          get_row_data() reads a row back when it is actually needed
         """
         self.text_columns = text_columns
-        self.dataframes = {}  # Store loaded CSVs
+        self.chunk_rows = chunk_rows
+        self.cache_dataframes = cache_dataframes
+        self.include_row_data = include_row_data
+        self.dataframes = {}  # Loaded CSVs (only when cache_dataframes=True)
+        self.schemas = {}  # source_file -> column names of its Documents
+        self.source_files = {}  # source_file -> (path, encoding) it was read with
         
         logger.info("📊 CSV Ingester initialized")
     
     
-    def load_csv(self, file_path: str, encoding: str = 'utf-8') -> pd.DataFrame:
+    def load_csv(self, file_path: str, encoding: Optional[str] = None) -> pd.DataFrame:
         """
         Load CSV file with error handling
         
@@ -66,24 +132,28 @@ class CSVIngester:
         - CSVs from Excel might be Latin1
         - CSVs from different countries have different encodings
         - Wrong encoding = garbled text
+        - None (default) = detect it from the file
         
         Returns: Pandas DataFrame
         """
         try:
             file_path = Path(file_path)
             
-            if not file_path.exists():
-                raise FileNotFoundError(f"CSV file not found: {file_path}")
-            
+            # No exists() check first
+            # WHY? Opening a missing file raises FileNotFoundError anyway,
+            # and the extra stat call is slow on network drives
             logger.info(f"📂 Loading CSV: {file_path.name}")
             
+            encoding = encoding or detect_encoding(file_path)
+            
             try:
-                df = pd.read_csv(file_path, encoding=encoding)
+                df = self._read_whole_csv(file_path, encoding)
             except UnicodeDecodeError:
                 logger.warning(f"⚠️  Encoding '{encoding}' failed, trying 'latin1'")
-                df = pd.read_csv(file_path, encoding='latin1')
+                df = self._read_whole_csv(file_path, 'latin1')
             
-            self.dataframes[file_path.name] = df
+            if self.cache_dataframes:
+                self.dataframes[file_path.name] = df
             
             logger.info(f"✅ Loaded {len(df)} rows, {len(df.columns)} columns")
             logger.info(f"📋 Columns: {', '.join(df.columns.tolist())}")
@@ -95,7 +165,38 @@ class CSVIngester:
             raise
     
     
-    def row_to_text(self, row: pd.Series, columns: Optional[List[str]] = None) -> str:
+    def _read_whole_csv(self, file_path: Path, encoding: str) -> pd.DataFrame:
+        """
+        Read a complete CSV, with the PyArrow parser when possible
+        
+        WHY PyArrow?
+        - Multithreaded C++ parser, several times faster on big files
+        - Falls back to pandas' own parser if pyarrow is missing or
+          can't handle the file (the fallback also raises the
+          UnicodeDecodeError that triggers the latin1 retry)
+        
+        Returns: Pandas DataFrame
+        """
+        try:
+            df = pd.read_csv(file_path, encoding=encoding, engine='pyarrow')
+            
+            # PyArrow keeps text it can't decode as raw bytes instead of failing
+            for col in df.select_dtypes(include='object'):
+                if df[col].map(type).eq(bytes).any():
+                    raise ValueError(f"column '{col}' is not valid {encoding}")
+            
+            return df
+        except Exception as e:
+            logger.debug(f"PyArrow CSV parser failed for {file_path.name} ({e}), using default parser")
+            return pd.read_csv(file_path, encoding=encoding)
+    
+    
+    def row_to_text(
+        self,
+        row,
+        columns: Optional[List[str]] = None,
+        prefixes: Optional[List[str]] = None
+    ) -> str:
         """
         Convert a CSV row to natural language text
         
@@ -104,57 +205,166 @@ class CSVIngester:
         - Creates searchable, meaningful sentences
         - Preserves all information in readable format
         
+        Parameters:
+        - row: pd.Series, or a plain tuple of values (e.g. from itertuples)
+        - columns: Columns to include (Series), or the name of each
+          value in the tuple
+        - prefixes: Precomputed "col is " strings, one per column
+          WHY? When converting many rows, build them once, not per cell
+        
         Returns: Natural language string
         """
-        cols = columns or row.index.tolist()
+        if isinstance(row, pd.Series):
+            cols = columns or row.index.tolist()
+            values = [row[col] for col in cols]
+        else:
+            cols, values = columns, row
+        
+        prefixes = prefixes or [f"{col} is " for col in cols]
         
-        text_parts = []
+        # Skip missing and empty cells
+        # WHY NOT pd.isna()? A pandas call per cell is slow; NaN and NaT are
+        # the only values not equal to themselves, None and pd.NA are singletons
+        text_parts = [
+            prefix + str(value)
+            for prefix, value in zip(prefixes, values)
+            if not (value is None or value is pd.NA or value != value or value == '')
+        ]
+        
+        return ". ".join(text_parts) + "."
+    
+    
+    def rows_to_texts(self, df: pd.DataFrame, columns: Optional[List[str]] = None) -> List[str]:
+        """
+        Convert ALL rows of a DataFrame to text at once
+        
+        WHY?
+        - Same output as calling row_to_text() on every row
+        - Works on whole columns instead of one row at a time
+        - Much faster for large CSVs (no per-row Python loop)
+        
+        HOW (Arrow compute kernels, no per-row Python):
+        1. Convert each column to an Arrow string array
+           (missing cells become nulls)
+        2. For each column: "col is value" where the cell has a value,
+           joined onto the text so far with ". "
+        3. Add the final "." and hand the strings back to Python once
+        
+        Returns: List of strings, one per row
+        """
+        cols = columns or df.columns.tolist()
+        
+        # null = "nothing written for this row yet"
+        texts = pa.nulls(len(df), pa.string())
         
         for col in cols:
-            value = row[col]
+            values = self._column_to_arrow(df[col])
             
-            if pd.isna(value) or value == '':
-                continue
+            # Skip missing and empty cells (same rule as row_to_text)
+            present = pc.fill_null(pc.not_equal(values, ''), False)
+            part = pc.binary_join_element_wise(f"{col} is ", values, '')
             
-            text_parts.append(f"{col} is {value}")
+            # Joining onto a null text gives null -> the part starts the text
+            joined = pc.coalesce(pc.binary_join_element_wise(texts, part, '. '), part)
+            texts = pc.if_else(present, joined, texts)
         
-        return ". ".join(text_parts) + "."
+        return pc.binary_join_element_wise(pc.fill_null(texts, ''), '.', '').to_pylist()
+    
+    
+    @staticmethod
+    def _column_to_arrow(column: pd.Series) -> pa.Array:
+        """
+        Convert one column to an Arrow string array, missing cells as nulls
+        
+        WHY TWO PATHS?
+        - Integers and strings: Arrow's cast gives exactly str(value)
+        - Floats, booleans, dates, mixed: Arrow formats them differently
+          (1.0 -> "1", True -> "true"), so pandas converts those
+        """
+        is_string = pd.api.types.is_string_dtype(column.dtype) and not pd.api.types.is_object_dtype(column)
+        
+        if pd.api.types.is_integer_dtype(column) or is_string:
+            return pc.cast(pa.array(column, from_pandas=True), pa.string())
+        
+        return pa.array(column.astype(str).where(column.notna(), None), type=pa.string(), from_pandas=True)
     
     
     def dataframe_to_documents(
         self, 
         df: pd.DataFrame, 
         source_name: str,
-        columns: Optional[List[str]] = None
+        columns: Optional[List[str]] = None,
+        include_row_data: Optional[bool] = None
     ) -> List[Document]:
         """
         Convert entire DataFrame to LlamaIndex Documents
         
+        Parameters:
+        - include_row_data: Store 'row_data' and 'columns' in the metadata
+          (default: the ingester's include_row_data setting)
+        
         Returns: List of LlamaIndex Documents
         """
+        if include_row_data is None:
+            include_row_data = self.include_row_data
+        
         logger.info(f"🔄 Converting {len(df)} rows to documents...")
         
-        documents = []
+        # Build the text for every row in one vectorized pass
+        texts = self.rows_to_texts(df, columns)
         
-        for idx, row in df.iterrows():
-            text = self.row_to_text(row, columns)
-            
-            if not text.strip():
-                continue
+        # Row numbers straight from the index, as Python ints
+        # WHY tolist()? One conversion instead of int() per row
+        row_numbers = df.index.tolist()
+        
+        # Same for every row - compute once
+        # WHY? One shared (read-only) column list and one clock read
+        # instead of one per row
+        column_names = list(df.columns)
+        ingested_at = datetime.now().isoformat()
+        self.schemas[source_name] = column_names
+        
+        if not include_row_data:
+            # Only what citations need - get_row_data() has the rest
+            documents = [
+                Document(
+                    text=text,
+                    metadata={
+                        'source_file': source_name,
+                        'source_type': 'csv',
+                        'row_number': row_number,
+                        'ingested_at': ingested_at
+                    }
+                )
+                for row_number, text in zip(row_numbers, texts)
+                if text.strip()
+            ]
             
-            doc = Document(
+            logger.info(f"✅ Created {len(documents)} documents from DataFrame")
+            return documents
+        
+        # Every row as a {column: value} dict, converted in one call
+        # WHY? No per-row Series (iterrows() also upcasts ints to float
+        # on mixed rows) and no per-row dict building in Python
+        records = df.to_dict(orient='records')
+        
+        # List comprehension instead of append() in a loop
+        # WHY? Python appends to the new list directly, no method lookup per row
+        documents = [
+            Document(
                 text=text,
                 metadata={
                     'source_file': source_name,
                     'source_type': 'csv',
-                    'row_number': int(idx),
-                    'columns': list(df.columns),
-                    'ingested_at': datetime.now().isoformat(),
-                    'row_data': row.to_dict()
+                    'row_number': row_number,
+                    'columns': column_names,
+                    'ingested_at': ingested_at,
+                    'row_data': record
                 }
             )
-            
-            documents.append(doc)
+            for row_number, record, text in zip(row_numbers, records, texts)
+            if text.strip()
+        ]
         
         logger.info(f"✅ Created {len(documents)} documents from DataFrame")
         return documents
@@ -170,12 +380,119 @@ class CSVIngester:
         
         Returns: List of Documents ready for indexing
         """
-        df = self.load_csv(file_path)
+        return list(self.iter_documents(file_path, columns))
+    
+    
+    def iter_documents(
+        self,
+        file_path: str,
+        columns: Optional[List[str]] = None
+    ) -> Iterator[Document]:
+        """
+        Stream a CSV as Documents, chunk_rows rows at a time
         
+        WHY READ IN CHUNKS?
+        - Only chunk_rows rows are in memory at a time
+        - Only the needed columns are parsed (when columns is given)
+        
+        WHY A GENERATOR?
+        - Documents go to the caller as each chunk is converted,
+          so a huge CSV never has to fit in memory as a whole
+        
+        Returns: Generator of Documents
+        """
         source_name = Path(file_path).name
-        documents = self.dataframe_to_documents(df, source_name, columns)
         
-        return documents
+        # Pick the encoding up front, so the file is normally read once
+        # (also raises FileNotFoundError for a missing file)
+        encoding = detect_encoding(file_path)
+        rows_done = 0
+        
+        try:
+            for chunk in self._read_chunks(file_path, source_name, columns, encoding):
+                yield from self.dataframe_to_documents(chunk, source_name, columns)
+                rows_done += len(chunk)
+        
+        except UnicodeDecodeError:
+            # Safety net: the samples can miss a stray byte further in
+            logger.warning(f"⚠️  Encoding '{encoding}' failed for {source_name}, trying 'latin1'")
+            
+            for chunk in self._read_chunks(file_path, source_name, columns, 'latin1'):
+                # Skip the rows already converted before the error
+                chunk = chunk[chunk.index >= rows_done]
+                if len(chunk):
+                    yield from self.dataframe_to_documents(chunk, source_name, columns)
+    
+    
+    def _read_chunks(
+        self,
+        file_path: str,
+        source_name: str,
+        columns: Optional[List[str]],
+        encoding: str
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read a CSV chunk_rows at a time
+        
+        Returns: Iterator of DataFrames (index = row number in the file)
+        """
+        logger.info(f"📂 Loading CSV: {source_name}")
+        
+        # Remembered so get_row_data() can read single rows back
+        self.source_files[source_name] = (str(file_path), encoding)
+        
+        # WHY ONLY columns? Row text has always covered every column;
+        # text_columns doesn't narrow it
+        return pd.read_csv(
+            file_path,
+            encoding=encoding,
+            usecols=columns,
+            chunksize=self.chunk_rows
+        )
+    
+    
+    def get_row_data(self, doc: Document) -> Dict:
+        """
+        Get the original {column: value} row behind a CSV Document
+        
+        WHY?
+        - Documents no longer carry a copy of their row by default
+        - The row is looked up only for the few Documents that need it
+          (e.g. the sources shown with an answer)
+        
+        WHERE FROM (first match wins):
+        1. The Document's own 'row_data' (include_row_data=True)
+        2. The cached DataFrame (cache_dataframes=True)
+        3. Re-reading just that one row from the CSV file
+        
+        Returns: Dictionary of column -> value
+        """
+        metadata = doc.metadata
+        
+        if 'row_data' in metadata:
+            return metadata['row_data']
+        
+        source_name = metadata['source_file']
+        row_number = metadata['row_number']
+        
+        if source_name in self.dataframes:
+            return self.dataframes[source_name].loc[row_number].to_dict()
+        
+        if source_name not in self.source_files:
+            raise KeyError(f"CSV source not read by this ingester: {source_name}")
+        
+        file_path, encoding = self.source_files[source_name]
+        
+        # Skip the rows before it (keeping the header), read one row
+        row = pd.read_csv(
+            file_path,
+            encoding=encoding,
+            usecols=self.schemas.get(source_name),
+            skiprows=range(1, row_number + 1),
+            nrows=1
+        )
+        
+        return row.to_dict(orient='records')[0]
     
     
     def ingest_directory(self, directory_path: str) -> List[Document]:
@@ -184,49 +501,84 @@ class CSVIngester:
         
         Returns: Combined list of all documents
         """
+        all_documents = list(self.iter_directory(directory_path))
+        
+        logger.info(f"✅ Total documents from all CSVs: {len(all_documents)}")
+        return all_documents
+    
+    
+    def iter_directory(self, directory_path: str) -> Iterator[Document]:
+        """
+        Stream Documents from all CSV files in a directory
+        
+        WHY?
+        - Same as ingest_directory, without collecting every row first
+        - A file that fails is logged and skipped
+        
+        Returns: Generator of Documents
+        """
         csv_dir = Path(directory_path)
         
         if not csv_dir.exists():
             raise ValueError(f"Directory not found: {directory_path}")
         
-        csv_files = list(csv_dir.glob("*.csv"))
+        csv_files = scan_directory(directory_path, ".csv")
         
         if not csv_files:
             logger.warning(f"⚠️  No CSV files found in {directory_path}")
-            return []
+            return
         
         logger.info(f"📚 Found {len(csv_files)} CSV file(s)")
         
-        all_documents = []
-        
         for csv_file in csv_files:
             try:
                 logger.info(f"📊 Processing: {csv_file.name}")
-                documents = self.ingest_csv(str(csv_file))
-                all_documents.extend(documents)
+                yield from self.iter_documents(str(csv_file))
             except Exception as e:
                 logger.error(f"❌ Failed to process {csv_file.name}: {str(e)}")
                 continue
-        
-        logger.info(f"✅ Total documents from all CSVs: {len(all_documents)}")
-        return all_documents
     
     
     def get_schema_info(self, file_path: str) -> Dict:
         """
         Get schema information about a CSV
         
+        WHY NOT load_csv()?
+        - Column types and the sample row only need the first rows
+        - The row count is taken by streaming ONE column in chunks
+        - So a schema query never holds the whole file in memory
+        
         Returns: Dictionary with schema info
         """
-        df = self.load_csv(file_path)
+        encoding = detect_encoding(file_path)
+        
+        try:
+            sample = pd.read_csv(file_path, encoding=encoding, nrows=SCHEMA_SAMPLE_ROWS)
+        except UnicodeDecodeError:
+            encoding = 'latin1'
+            sample = pd.read_csv(file_path, encoding=encoding, nrows=SCHEMA_SAMPLE_ROWS)
+        
+        if len(sample) < SCHEMA_SAMPLE_ROWS:
+            # The sample is the whole file
+            num_rows = len(sample)
+        else:
+            num_rows = sum(
+                len(chunk) for chunk in pd.read_csv(
+                    file_path,
+                    encoding=encoding,
+                    usecols=[0],
+                    chunksize=self.chunk_rows,
+                    encoding_errors='replace'
+                )
+            )
         
         schema = {
             'filename': Path(file_path).name,
-            'num_rows': len(df),
-            'num_columns': len(df.columns),
-            'columns': df.columns.tolist(),
-            'dtypes': df.dtypes.astype(str).to_dict(),
-            'sample_row': df.iloc[0].to_dict() if len(df) > 0 else {}
+            'num_rows': num_rows,
+            'num_columns': len(sample.columns),
+            'columns': sample.columns.tolist(),
+            'dtypes': sample.dtypes.astype(str).to_dict(),
+            'sample_row': sample.iloc[0].to_dict() if len(sample) > 0 else {}
         }
         
         return schema
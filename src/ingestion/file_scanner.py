@@ -0,0 +1,72 @@
+"""
+Directory Scanning Module
+
+WHY THIS EXISTS:
+- PDF and CSV ingestion both need "all files of one type in a folder"
+- Hidden files and Office lock files (~$report.csv) match the
+  extension but are not real data, and fail when parsed
+- One shared scan keeps the rules the same for every source
+
+HOW IT WORKS:
+1. Walk the folder once with os.scandir
+2. Keep regular files with the wanted extension (any case)
+3. Skip hidden files and lock files, and log how many were skipped
+"""
+
+import os
+from collections import Counter
+from pathlib import Path
+from typing import List
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Name prefixes of files that are never ingested
+# WHY? "." = hidden/editor swap files, "~$" = Office lock files
+SKIPPED_PREFIXES = {
+    '.': 'hidden',
+    '~$': 'lock file',
+}
+
+
+def scan_directory(directory_path: str, extension: str) -> List[Path]:
+    """
+    List the data files with one extension in a folder
+    
+    WHY os.scandir (not Path.glob)?
+    - The file type comes with each directory entry,
+      no extra stat call per file
+    - No pattern matching, just a suffix check
+    
+    Parameters:
+    - directory_path: Folder to scan (not recursive)
+    - extension: File extension including the dot (e.g. ".pdf")
+    
+    Returns: List of file paths
+    """
+    extension = extension.lower()
+    files = []
+    skipped = Counter()
+    
+    with os.scandir(directory_path) as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith(extension):
+                continue
+            
+            reason = next(
+                (label for prefix, label in SKIPPED_PREFIXES.items() if entry.name.startswith(prefix)),
+                None
+            )
+            if reason is None and not entry.is_file():
+                reason = 'not a file'
+            
+            if reason:
+                skipped[reason] += 1
+            else:
+                files.append(Path(entry.path))
+    
+    for reason, count in skipped.items():
+        logger.info(f"⏭️  Skipped {count} {extension} file(s) in {directory_path} ({reason})")
+    
+    return files
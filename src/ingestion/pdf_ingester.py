@@ -14,17 +14,162 @@ HOW IT WORKS:
 """
 
 import os
-from typing import List
+import hashlib
+import pickle
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Callable, Iterator, List, Optional
 from pathlib import Path
 from llama_index.core import Document, SimpleDirectoryReader
 from llama_index.core.node_parser import SimpleNodeParser
 from pypdf import PdfReader
 import logging
 
+# Import the shared folder scan
+# (project root added only when run as a script)
+import sys
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.ingestion.file_scanner import scan_directory
+
+# Prefer the C-based PyMuPDF extractor (pip install pymupdf), fall back to pypdf
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
 # Set up logging to see what's happening
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pages chunked together while streaming a PDF
+# WHY? Bounds memory for very long PDFs
+PAGES_PER_BATCH = 32
+
+# Bytes hashed at a time when fingerprinting a PDF for the chunk cache
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _iter_page_texts(pdf_path: str) -> Iterator[tuple]:
+    """
+    Read the raw text of each page with the fastest available library
+    
+    WHY PyMuPDF FIRST?
+    - Its parser is written in C (MuPDF)
+    - pypdf interprets the PDF in pure Python (often 5-20x slower)
+    
+    Returns: Generator of (page_number, text, total_pages)
+    """
+    if pymupdf is not None:
+        with pymupdf.open(pdf_path, filetype="pdf") as doc:
+            total_pages = doc.page_count
+            for page_num, page in enumerate(doc, start=1):
+                yield page_num, page.get_text("text"), total_pages
+        return
+    
+    # WHY strict=False? Tolerate small format errors instead of failing,
+    # and skip the extra validation (pinned in case the default changes)
+    reader = PdfReader(pdf_path, strict=False)
+    total_pages = len(reader.pages)
+    for page_num, page in enumerate(reader.pages, start=1):
+        yield page_num, page.extract_text(), total_pages
+
+
+def _iter_pdf_pages(pdf_path: str) -> Iterator[dict]:
+    """
+    Read a PDF page by page (text + metadata)
+    
+    WHY MODULE LEVEL?
+    - Worker processes can only run importable functions
+    - Pages are plain dicts, which pickle cheaply between processes
+    
+    Returns: Generator of dictionaries with text and metadata
+    """
+    filename = os.path.basename(pdf_path)
+    extracted = 0
+    
+    try:
+        # Process each page separately
+        # WHY? Preserves page numbers for citations
+        for page_num, text, total_pages in _iter_page_texts(pdf_path):
+            # Skip empty pages
+            # WHY? No point indexing blank pages
+            if not text.strip():
+                continue
+            
+            # Create document with metadata
+            # WHY METADATA? For citations: "Found on page 5 of report.pdf"
+            extracted += 1
+            yield {
+                'text': text,
+                'metadata': {
+                    'filename': filename,
+                    'page': page_num,
+                    'source_type': 'pdf',
+                    'total_pages': total_pages
+                }
+            }
+        
+        logger.info(f"✅ Extracted {extracted} pages from {filename}")
+    
+    except Exception as e:
+        logger.error(f"❌ Error processing {pdf_path}: {str(e)}")
+
+
+def _read_pdf_pages(pdf_path: str) -> List[dict]:
+    """
+    Worker-process entry point: all pages of one PDF
+    
+    Returns: List of dictionaries with text and metadata
+    """
+    return list(_iter_pdf_pages(pdf_path))
+
+
+def _iter_pdf_chunks(pdf_path: str, chunk: Callable[[List[Document]], List]) -> Iterator:
+    """
+    Read and chunk one PDF, a few pages at a time
+    
+    WHY PAGES_PER_BATCH?
+    - Even one huge PDF is never fully in memory
+    
+    Returns: Generator of chunks (nodes)
+    """
+    documents = (
+        Document(text=page_data['text'], metadata=page_data['metadata'])
+        for page_data in _iter_pdf_pages(pdf_path)
+    )
+    
+    while batch := list(islice(documents, PAGES_PER_BATCH)):
+        yield from chunk(batch)
+
+
+# One node parser per worker process and chunk setting
+_worker_parsers = {}
+
+
+def _read_pdf_chunks(pdf_path: str, chunk_size: int, chunk_overlap: int) -> List:
+    """
+    Worker-process entry point: all chunks of one PDF
+    
+    WHY CHUNK IN THE WORKER?
+    - Sentence splitting is pure Python: threads would take turns on the GIL
+    - Each worker splits its own PDF on its own core
+    
+    Returns: List of chunks (nodes)
+    """
+    key = (chunk_size, chunk_overlap)
+    if key not in _worker_parsers:
+        _worker_parsers[key] = SimpleNodeParser.from_defaults(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+    
+    return list(_iter_pdf_chunks(pdf_path, _worker_parsers[key].get_nodes_from_documents))
+
 
 class PDFIngester:
     """
@@ -36,7 +181,13 @@ class PDFIngester:
     - Can store configuration (chunk size, etc.)
     """
     
-    def __init__(self, chunk_size: int = 1024, chunk_overlap: int = 200):
+    def __init__(
+        self,
+        chunk_size: int = 1024,
+        chunk_overlap: int = 200,
+        max_workers: Optional[int] = None,
+        chunk_cache_dir: Optional[str] = ".cache/chunks"
+    ):
         """
         Initialize the PDF ingester
         
@@ -45,9 +196,15 @@ class PDFIngester:
           WHY? Too small = loses context, too large = irrelevant info
         - chunk_overlap: How many characters overlap between chunks (default 200)
           WHY? Ensures we don't split important sentences/paragraphs
+        - max_workers: Processes for reading several PDFs (default: all cores)
+          WHY? Text extraction is CPU-bound, one PDF per core
+        - chunk_cache_dir: Where chunks of already-seen PDFs are kept (None = off)
+          WHY? Re-ingesting an unchanged PDF skips extraction and chunking
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_cache_dir = Path(chunk_cache_dir) if chunk_cache_dir else None
         
         # Node parser splits documents into chunks
         # WHY? LLMs have token limits, need smaller pieces
@@ -59,7 +216,7 @@ class PDFIngester:
         logger.info(f"📄 PDF Ingester initialized with chunk_size={chunk_size}, overlap={chunk_overlap}")
     
     
-    def extract_text_from_pdf(self, pdf_path: str) -> List[dict]:
+    def extract_text_from_pdf(self, pdf_path: str) -> Iterator[dict]:
         """
         Extract text from a single PDF file
         
@@ -68,41 +225,13 @@ class PDFIngester:
         - Easy to test individually
         - Can handle errors for specific files
         
-        Returns: List of dictionaries with text and metadata
+        WHY A GENERATOR?
+        - Pages come out one at a time as they are read
+        - A long PDF never needs all its pages in memory at once
+        
+        Returns: Generator of dictionaries with text and metadata
         """
-        try:
-            reader = PdfReader(pdf_path)
-            filename = os.path.basename(pdf_path)
-            documents = []
-            
-            # Process each page separately
-            # WHY? Preserves page numbers for citations
-            for page_num, page in enumerate(reader.pages, start=1):
-                text = page.extract_text()
-                
-                # Skip empty pages
-                # WHY? No point indexing blank pages
-                if not text.strip():
-                    continue
-                
-                # Create document with metadata
-                # WHY METADATA? For citations: "Found on page 5 of report.pdf"
-                documents.append({
-                    'text': text,
-                    'metadata': {
-                        'filename': filename,
-                        'page': page_num,
-                        'source_type': 'pdf',
-                        'total_pages': len(reader.pages)
-                    }
-                })
-            
-            logger.info(f"✅ Extracted {len(documents)} pages from {filename}")
-            return documents
-            
-        except Exception as e:
-            logger.error(f"❌ Error processing {pdf_path}: {str(e)}")
-            return []
+        return _iter_pdf_pages(pdf_path)
     
     
     def ingest_directory(self, directory_path: str) -> List[Document]:
@@ -116,6 +245,129 @@ class PDFIngester:
         
         Returns: List of LlamaIndex Document objects
         """
+        # Process each PDF, one Document per page
+        all_documents = [
+            document
+            for pages in self._extract_pdfs(self._find_pdfs(directory_path))
+            for document in self._to_documents(pages)
+        ]
+        
+        logger.info(f"✅ Total documents created: {len(all_documents)}")
+        return all_documents
+    
+    
+    def iter_chunks(self, directory_path: str) -> Iterator:
+        """
+        Ingest and chunk PDFs one file at a time
+        
+        WHY?
+        - ingest_directory + chunk_documents hold every page of every
+          PDF in memory before the first chunk comes out
+        - Here only a batch of ONE PDF's pages is alive at a time
+        - Memory stays flat no matter how many PDFs are in the folder
+        
+        WHY THE CHUNK CACHE?
+        - Chunking is deterministic: same file + same settings = same chunks
+        - PDFs seen before are loaded from disk, only new ones are extracted
+        
+        Returns: Generator of chunks (nodes)
+        """
+        pdf_files = self._find_pdfs(directory_path)
+        cache_paths = {pdf_file: self._chunk_cache_path(pdf_file) for pdf_file in pdf_files}
+        
+        cached = {pdf_file: self._load_cached_chunks(path) for pdf_file, path in cache_paths.items()}
+        to_extract = [pdf_file for pdf_file in pdf_files if cached[pdf_file] is None]
+        
+        if len(to_extract) < len(pdf_files):
+            logger.info(f"♻️  Reusing cached chunks for {len(pdf_files) - len(to_extract)} PDF(s)")
+        
+        extracted = self._extract_pdfs(to_extract, chunked=True)
+        
+        # Keep the folder order, cached or not
+        for pdf_file in pdf_files:
+            if cached[pdf_file] is not None:
+                yield from cached[pdf_file]
+                continue
+            
+            nodes = []
+            for node in next(extracted):
+                nodes.append(node)
+                yield node
+            
+            self._save_cached_chunks(cache_paths[pdf_file], nodes)
+    
+    
+    def _chunk_cache_path(self, pdf_file: Path) -> Optional[Path]:
+        """
+        Cache file for one PDF's chunks
+        
+        WHY HASH THE CONTENT (not just name + modified time)?
+        - Uploaded files get a fresh modified time on every upload
+        - Same name + same bytes + same chunk settings = same chunks
+          (the name is part of every chunk's metadata)
+        - blake2b: fast, and this key does not need to be secure
+        
+        Returns: Path of the cache file (None if caching is off)
+        """
+        if self.chunk_cache_dir is None:
+            return None
+        
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{pdf_file.name}:{self.chunk_size}:{self.chunk_overlap}:".encode())
+        
+        with open(pdf_file, 'rb') as f:
+            while block := f.read(HASH_BLOCK_SIZE):
+                digest.update(block)
+        
+        return self.chunk_cache_dir / f"{digest.hexdigest()}.pkl"
+    
+    
+    def _load_cached_chunks(self, cache_path: Optional[Path]) -> Optional[List]:
+        """
+        Load cached chunks
+        
+        Returns: List of chunks (None on a miss or an unreadable cache file)
+        """
+        if cache_path is None:
+            return None
+        
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️  Ignoring unreadable chunk cache {cache_path.name}: {str(e)}")
+            return None
+    
+    
+    def _save_cached_chunks(self, cache_path: Optional[Path], nodes: List) -> None:
+        """
+        Store one PDF's chunks for the next run
+        
+        WHY WRITE TO A TEMP FILE FIRST?
+        - An interrupted write never leaves a half-written cache file behind
+        """
+        # Nothing extracted (e.g. unreadable PDF) - try again next time
+        if cache_path is None or not nodes:
+            return
+        
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(nodes, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not write chunk cache: {str(e)}")
+    
+    
+    def _find_pdfs(self, directory_path: str) -> List[Path]:
+        """
+        List the PDF files in a directory
+        
+        Returns: List of PDF paths (empty if none found)
+        """
         pdf_dir = Path(directory_path)
         
         # Check if directory exists
@@ -124,35 +376,100 @@ class PDFIngester:
             raise ValueError(f"Directory not found: {directory_path}")
         
         # Find all PDF files
-        # WHY *.pdf? Only process PDF files, ignore images, text files, etc.
-        pdf_files = list(pdf_dir.glob("*.pdf"))
+        # WHY .pdf only? Only process PDF files, ignore images, text files, etc.
+        pdf_files = scan_directory(directory_path, ".pdf")
         
         if not pdf_files:
             logger.warning(f"⚠️  No PDF files found in {directory_path}")
             return []
         
         logger.info(f"📚 Found {len(pdf_files)} PDF file(s)")
+        return pdf_files
+    
+    
+    def _extract_pdfs(self, pdf_files: List[Path], chunked: bool = False) -> Iterator:
+        """
+        Extract (and optionally chunk) several PDFs, in parallel worker
+        processes when worthwhile
         
-        all_documents = []
+        WHY PROCESSES?
+        - pypdf and the sentence splitter are pure Python:
+          threads would take turns on the GIL
+        - Each PDF is independent, so each core can handle its own file
         
-        # Process each PDF
-        for pdf_file in pdf_files:
-            logger.info(f"📄 Processing: {pdf_file.name}")
-            
-            # Extract text from this PDF
-            pages = self.extract_text_from_pdf(str(pdf_file))
-            
-            # Convert to LlamaIndex Document format
-            # WHY? LlamaIndex needs this specific format
-            for page_data in pages:
-                doc = Document(
-                    text=page_data['text'],
-                    metadata=page_data['metadata']
-                )
-                all_documents.append(doc)
+        WHY A WINDOW?
+        - Only a few PDFs are extracted ahead of the caller,
+          so finished pages don't pile up in memory
         
-        logger.info(f"✅ Total documents created: {len(all_documents)}")
-        return all_documents
+        Parameters:
+        - chunked: Hand back chunks instead of pages
+          WHY? Chunking happens in the workers too, not only extraction
+        
+        Returns: Generator of page (or chunk) lists/iterators, one per PDF (in order)
+        """
+        workers = min(self.max_workers, len(pdf_files))
+        
+        # One PDF (or one core): not worth starting processes
+        if workers <= 1:
+            for pdf_file in pdf_files:
+                logger.info(f"📄 Processing: {pdf_file.name}")
+                yield self._read_in_process(pdf_file, chunked)
+            return
+        
+        logger.info(f"⚡ Extracting {len(pdf_files)} PDFs with {workers} processes")
+        
+        done = 0
+        try:
+            # WHY spawn? Forking a process that runs threads can deadlock
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                pending = deque()
+                for pdf_file in pdf_files:
+                    if chunked:
+                        future = executor.submit(_read_pdf_chunks, str(pdf_file), self.chunk_size, self.chunk_overlap)
+                    else:
+                        future = executor.submit(_read_pdf_pages, str(pdf_file))
+                    pending.append(future)
+                    
+                    if len(pending) >= 2 * workers:
+                        yield pending.popleft().result()
+                        done += 1
+                
+                while pending:
+                    yield pending.popleft().result()
+                    done += 1
+        
+        except BrokenProcessPool as e:
+            # E.g. the main script can't be re-imported by the workers
+            logger.warning(f"⚠️  PDF worker processes failed ({e}), continuing in this process")
+            for pdf_file in pdf_files[done:]:
+                yield self._read_in_process(pdf_file, chunked)
+    
+    
+    def _read_in_process(self, pdf_file: Path, chunked: bool) -> Iterator:
+        """
+        Extract (and optionally chunk) one PDF in this process
+        
+        Returns: Generator of pages (or chunks)
+        """
+        if chunked:
+            return _iter_pdf_chunks(str(pdf_file), self.chunk_documents)
+        return self.extract_text_from_pdf(str(pdf_file))
+    
+    
+    def _to_documents(self, pages) -> Iterator[Document]:
+        """
+        Turn extracted pages into LlamaIndex Documents (one per page)
+        
+        Returns: Generator of Documents
+        """
+        # Convert to LlamaIndex Document format
+        # WHY? LlamaIndex needs this specific format
+        for page_data in pages:
+            yield Document(
+                text=page_data['text'],
+                metadata=page_data['metadata']
+            )
     
     
     def chunk_documents(self, documents: List[Document]) -> List:
@@ -26,13 +26,34 @@ from pathlib import Path
 import logging
 from datetime import datetime
 import hashlib
+import threading
+from array import array
+from itertools import islice
+import numpy as np
+import pyarrow as pa
+
+# Prefer the xxh3 hash (pip install xxhash), fall back to BLAKE2b
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Near-duplicate detection is optional (pip install datasketch)
+try:
+    from datasketch import MinHash, MinHashLSH
+    DATASKETCH_AVAILABLE = True
+except ImportError:
+    DATASKETCH_AVAILABLE = False
 
 # Import our custom ingesters
 import sys
-from pathlib import Path
 
-# Add parent directory to path
-sys.path.append(str(Path(__file__).parent.parent.parent))
+# Only when run as a script (python src/ingestion/unified_manager.py):
+# make the project root importable
+# WHY ONLY THEN? A normal import already finds `src`, and every extra
+# sys.path entry slows down all later imports
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from src.ingestion.pdf_ingester import PDFIngester
 from src.ingestion.web_scraper import WebScraper
@@ -41,6 +62,23 @@ from src.ingestion.csv_ingester import CSVIngester
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Source type of each document, stored as a 1-byte code
+# WHY? Statistics count a byte array in one call instead of
+# looking up every document's metadata dict
+SOURCE_TYPES = ('pdf', 'web', 'csv')
+SOURCE_CODES = {source_type: code for code, source_type in enumerate(SOURCE_TYPES)}
+OTHER_SOURCE_CODE = len(SOURCE_TYPES)
+
+# Documents deduplicated together while streaming a source
+# WHY? One lock round-trip per batch instead of two per document
+DEDUP_BATCH_SIZE = 256
+
+# MinHash settings for near-duplicate detection
+# WHY 64 permutations? Enough to estimate similarity of ~1000-character
+# chunks, while keeping each signature small
+NEAR_DUP_NUM_PERM = 64
+NEAR_DUP_SHINGLE_SIZE = 5
+
 
 class UnifiedIngestionManager:
     """
@@ -61,7 +99,8 @@ class UnifiedIngestionManager:
         self,
         chunk_size: int = 1024,
         chunk_overlap: int = 200,
-        web_delay: float = 1.0
+        web_delay: float = 1.0,
+        near_duplicate_threshold: Optional[float] = None
     ):
         """
         Initialize unified manager
@@ -70,6 +109,10 @@ class UnifiedIngestionManager:
         - chunk_size: Size of text chunks (default 1024)
         - chunk_overlap: Overlap between chunks (default 200)
         - web_delay: Delay between web requests (default 1.0s)
+        - near_duplicate_threshold: Also skip chunks at least this similar
+          to one already added, e.g. 0.9 (default None = exact duplicates only)
+          WHY? The same article scraped twice with a different date or
+          banner hashes differently, but is still the same content
         
         WHY THESE PARAMETERS?
         - Apply same chunking across all sources (consistency!)
@@ -85,6 +128,13 @@ class UnifiedIngestionManager:
         # WHY LIST? Easy to add, iterate, and index
         self.documents: List[Document] = []
         
+        # Source code of each document (same order as self.documents)
+        self.source_codes = array('b')
+        
+        # Running total of document text length
+        # WHY? Statistics read one number instead of summing every document
+        self.total_chars = 0
+        
         # Track sources
         # WHY? Know what we've ingested, avoid duplicates
         self.sources_added: Dict[str, List[str]] = {
@@ -95,7 +145,15 @@ class UnifiedIngestionManager:
         
         # Track document hashes for deduplication
         # WHY? Same content might come from multiple sources
-        self.content_hashes: set = set()
+        self.content_hashes: set[bytes] = set()
+        
+        # Near-duplicate index (MinHash signatures, bucketed by LSH)
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.lsh = self._new_lsh()
+        
+        # Guards the check-then-add in _add_new_documents
+        # WHY? add_pdfs/add_csvs/add_urls may run in parallel threads
+        self._lock = threading.Lock()
         
         logger.info("🎯 Unified Ingestion Manager initialized")
         logger.info(f"   • Chunk size: {chunk_size}")
@@ -103,7 +161,7 @@ class UnifiedIngestionManager:
         logger.info(f"   • Web delay: {web_delay}s")
     
     
-    def _compute_hash(self, text: str) -> str:
+    def _compute_hash(self, text: str) -> bytes:
         """
         Compute hash of text for deduplication
         
@@ -113,23 +171,86 @@ class UnifiedIngestionManager:
         - Memory efficient
         
         HOW IT WORKS:
-        Text → SHA256 → "a3f2b1c4..." (unique fingerprint)
+        Text → collapse whitespace → xxh3-128 (or BLAKE2b) → 16 raw bytes
+        
+        WHY COLLAPSE WHITESPACE?
+        - The same PDF extracted by different tools (or a page scraped
+          twice) often differs only in line breaks and spaces
+        - Hashing "words separated by one space" makes those copies match
+        - Only the hash key changes, the stored text is untouched
+        
+        WHY xxh3?
+        - Dedup only needs a set key, not a cryptographic hash
+        - Many times faster than BLAKE2b/SHA256 per byte
+        - BLAKE2b (still faster than SHA256) when xxhash isn't installed
+        - 16 bytes is plenty for dedup and half the memory of a hex string
         
         EXAMPLE:
-        "Hello World" → "a591a6d40b..."
-        "Hello World" → "a591a6d40b..." (same hash!)
-        "Hello World!" → "different hash" (different text)
+        "Hello World" → b'\x0c\xc8...'
+        "Hello World" → b'\x0c\xc8...' (same hash!)
+        "Hello\n  World" → same hash (only whitespace differs)
+        "Hello World!" → different hash (different text)
         
-        Returns: Hexadecimal hash string
+        Returns: 16-byte digest
         """
-        return hashlib.sha256(text.encode()).hexdigest()
+        # Encoded once, straight into the hash (no hex string afterwards)
+        # WHY surrogatepass? Text extracted from broken PDFs can hold lone
+        # surrogates - a strict encode() would raise and fail the whole source
+        data = ' '.join(text.split()).encode('utf-8', 'surrogatepass')
+        
+        if xxhash is not None:
+            return xxhash.xxh3_128_digest(data)
+        return hashlib.blake2b(data, digest_size=16).digest()
     
     
-    def _is_duplicate(self, text: str) -> bool:
+    def _new_lsh(self):
         """
-        Check if content is duplicate
+        Create an empty near-duplicate index (None when turned off)
         
-        WHY?
+        WHY LSH?
+        - Comparing every chunk with every other chunk is O(N²)
+        - LSH only compares chunks whose signatures share a bucket
+        
+        Returns: MinHashLSH or None
+        """
+        if self.near_duplicate_threshold is None:
+            return None
+        
+        if not DATASKETCH_AVAILABLE:
+            raise ImportError("Near-duplicate detection requires `pip install datasketch`")
+        
+        return MinHashLSH(threshold=self.near_duplicate_threshold, num_perm=NEAR_DUP_NUM_PERM)
+    
+    
+    def _compute_minhash(self, text: str):
+        """
+        MinHash signature of a text's character shingles
+        
+        HOW IT WORKS:
+        "policy text" → {"polic", "olicy", "licy ", ...} → 64 numbers
+        Two texts sharing most shingles get mostly the same numbers
+        
+        Returns: MinHash
+        """
+        shingles = {
+            text[i:i + NEAR_DUP_SHINGLE_SIZE]
+            for i in range(max(1, len(text) - NEAR_DUP_SHINGLE_SIZE + 1))
+        }
+        
+        # Hash shingles with xxh32 when available (datasketch defaults to SHA1)
+        if xxhash is not None:
+            minhash = MinHash(num_perm=NEAR_DUP_NUM_PERM, hashfunc=xxhash.xxh32_intdigest)
+        else:
+            minhash = MinHash(num_perm=NEAR_DUP_NUM_PERM)
+        minhash.update_batch([shingle.encode('utf-8', 'surrogatepass') for shingle in shingles])
+        return minhash
+    
+    
+    def _add_new_documents(self, docs: List[Document]) -> int:
+        """
+        Deduplicate a batch of documents and store the new ones
+        
+        WHY DEDUPLICATE?
         - Same document might be in multiple places
         - Avoid indexing same content twice
         - Save processing time and storage
@@ -138,17 +259,62 @@ class UnifiedIngestionManager:
         Company policy PDF on website AND in local folder
         → Only index once!
         
-        Returns: True if duplicate, False if new
+        WHY A BATCH?
+        - All hashes are computed first, outside the lock
+        - Then ONE lock holds the check-then-add for the whole batch
+          (instead of one lock for the check + one for the add per document)
+        - The documents and their source codes stay in the same order,
+          even with sources added from parallel threads
+        
+        Returns: Number of documents added
+        """
+        hashes = [self._compute_hash(doc.text) for doc in docs]
+        codes = [SOURCE_CODES.get(doc.metadata.get('source_type'), OTHER_SOURCE_CODE) for doc in docs]
+        minhashes = [self._compute_minhash(doc.text) for doc in docs] if self.lsh is not None else [None] * len(docs)
+        added_count = 0
+        
+        # Checked once per batch
+        # WHY? An f-string is built even when DEBUG is off and the message dropped
+        log_duplicates = logger.isEnabledFor(logging.DEBUG)
+        
+        with self._lock:
+            for doc, content_hash, code, minhash in zip(docs, hashes, codes, minhashes):
+                if content_hash in self.content_hashes:
+                    if log_duplicates:
+                        logger.debug(f"⚠️  Duplicate content detected (hash: {content_hash.hex()})")
+                    continue
+                
+                if minhash is not None:
+                    if self.lsh.query(minhash):
+                        if log_duplicates:
+                            logger.debug(f"⚠️  Near-duplicate content detected (hash: {content_hash.hex()})")
+                        continue
+                    self.lsh.insert(len(self.documents), minhash)
+                
+                self.content_hashes.add(content_hash)
+                self.documents.append(doc)
+                self.source_codes.append(code)
+                self.total_chars += len(doc.text)
+                added_count += 1
+        
+        return added_count
+    
+    
+    def _add_document_stream(self, docs) -> tuple:
+        """
+        Deduplicate and store documents as they stream in, a batch at a time
+        
+        Returns: (documents added, documents seen)
         """
-        content_hash = self._compute_hash(text)
+        added_count = 0
+        seen_count = 0
+        docs = iter(docs)
         
-        if content_hash in self.content_hashes:
-            logger.debug(f"⚠️  Duplicate content detected (hash: {content_hash[:16]}...)")
-            return True
+        while batch := list(islice(docs, DEDUP_BATCH_SIZE)):
+            added_count += self._add_new_documents(batch)
+            seen_count += len(batch)
         
-        # Add to seen hashes
-        self.content_hashes.add(content_hash)
-        return False
+        return added_count, seen_count
     
     
     def add_pdfs(self, directory_path: str) -> int:
@@ -165,24 +331,17 @@ class UnifiedIngestionManager:
         logger.info(f"📄 Adding PDFs from: {directory_path}")
         
         try:
-            # Ingest PDFs
-            pdf_documents = self.pdf_ingester.ingest_directory(directory_path)
-            
-            # Chunk them
-            # WHY? PDFs can be long, need smaller pieces
-            chunks = self.pdf_ingester.chunk_documents(pdf_documents)
-            
+            # Ingest and chunk PDFs one file at a time
+            # WHY? PDFs can be long - only one file's pages stay in memory
             # Add non-duplicate chunks
-            added_count = 0
-            for chunk in chunks:
-                if not self._is_duplicate(chunk.text):
-                    self.documents.append(chunk)
-                    added_count += 1
+            added_count, chunk_count = self._add_document_stream(
+                self.pdf_ingester.iter_chunks(directory_path)
+            )
             
             # Track this source
             self.sources_added['pdfs'].append(directory_path)
             
-            logger.info(f"✅ Added {added_count} PDF chunks ({len(chunks) - added_count} duplicates skipped)")
+            logger.info(f"✅ Added {added_count} PDF chunks ({chunk_count - added_count} duplicates skipped)")
             return added_count
             
         except Exception as e:
@@ -204,20 +363,15 @@ class UnifiedIngestionManager:
         logger.info(f"🌐 Adding {len(urls)} URL(s)")
         
         try:
-            # Scrape URLs
-            web_documents = self.web_scraper.scrape_urls(urls)
-            
-            # Add non-duplicate documents
-            added_count = 0
-            for doc in web_documents:
-                if not self._is_duplicate(doc.text):
-                    self.documents.append(doc)
-                    added_count += 1
+            # Scrape URLs and add non-duplicate pages as they arrive
+            added_count, page_count = self._add_document_stream(
+                self.web_scraper.iter_urls(urls)
+            )
             
             # Track sources
             self.sources_added['urls'].extend(urls)
             
-            logger.info(f"✅ Added {added_count} web documents ({len(web_documents) - added_count} duplicates skipped)")
+            logger.info(f"✅ Added {added_count} web documents ({page_count - added_count} duplicates skipped)")
             return added_count
             
         except Exception as e:
@@ -239,20 +393,17 @@ class UnifiedIngestionManager:
         logger.info(f"📊 Adding CSVs from: {directory_path}")
         
         try:
-            # Ingest CSVs
-            csv_documents = self.csv_ingester.ingest_directory(directory_path)
-            
+            # Ingest CSVs chunk by chunk
+            # WHY? Only one batch of rows (plus what we keep) is in memory
             # Add non-duplicate documents
-            added_count = 0
-            for doc in csv_documents:
-                if not self._is_duplicate(doc.text):
-                    self.documents.append(doc)
-                    added_count += 1
+            added_count, row_count = self._add_document_stream(
+                self.csv_ingester.iter_directory(directory_path)
+            )
             
             # Track sources
             self.sources_added['csvs'].append(directory_path)
             
-            logger.info(f"✅ Added {added_count} CSV documents ({len(csv_documents) - added_count} duplicates skipped)")
+            logger.info(f"✅ Added {added_count} CSV documents ({row_count - added_count} duplicates skipped)")
             return added_count
             
         except Exception as e:
@@ -323,6 +474,42 @@ class UnifiedIngestionManager:
         return self.documents
     
     
+    def get_documents_table(self) -> pa.Table:
+        """
+        Get all ingested documents as one columnar Arrow table
+        
+        WHY?
+        - Worker processes (e.g. a parallel embedder) can receive the
+          table through Arrow IPC / shared memory without pickling
+          thousands of Document objects
+        - Column-wise C kernels (pyarrow.compute) work on it directly
+        
+        COLUMNS:
+        - text: Document text
+        - source_type: 'pdf' / 'web' / 'csv' (dictionary-encoded)
+        - filename: PDF file name (null for other sources)
+        - url: Web page URL (null for other sources)
+        
+        Returns: pyarrow.Table, one row per document (same order)
+        """
+        with self._lock:
+            documents = list(self.documents)
+            codes = np.frombuffer(self.source_codes, dtype=np.int8).copy()
+        
+        # Source type as dictionary indices into SOURCE_TYPES (+ "other")
+        source_type = pa.DictionaryArray.from_arrays(
+            pa.array(codes),
+            pa.array(SOURCE_TYPES + ('other',))
+        )
+        
+        return pa.table({
+            'text': pa.array([doc.text for doc in documents], type=pa.string()),
+            'source_type': source_type,
+            'filename': pa.array([doc.metadata.get('filename') for doc in documents], type=pa.string()),
+            'url': pa.array([doc.metadata.get('url') for doc in documents], type=pa.string()),
+        })
+    
+    
     def get_statistics(self) -> Dict:
         """
         Get ingestion statistics
@@ -336,26 +523,26 @@ class UnifiedIngestionManager:
         """
         # Count documents by source type
         # WHY? Know distribution of content
+        with self._lock:
+            counts = np.bincount(
+                np.frombuffer(self.source_codes, dtype=np.int8),
+                minlength=len(SOURCE_TYPES) + 1
+            )
+            total_docs = len(self.documents)
+            
+            # Total text length, kept up to date as documents are added
+            # WHY? Know how much content we have
+            total_chars = self.total_chars
         source_counts = {
-            'pdf': 0,
-            'web': 0,
-            'csv': 0
+            source_type: int(counts[code])
+            for code, source_type in enumerate(SOURCE_TYPES)
         }
         
-        for doc in self.documents:
-            source_type = doc.metadata.get('source_type', 'unknown')
-            if source_type in source_counts:
-                source_counts[source_type] += 1
-        
-        # Calculate total text length
-        # WHY? Know how much content we have
-        total_chars = sum(len(doc.text) for doc in self.documents)
-        
         stats = {
-            'total_documents': len(self.documents),
+            'total_documents': total_docs,
             'by_source': source_counts,
             'total_characters': total_chars,
-            'average_doc_length': total_chars // len(self.documents) if self.documents else 0,
+            'average_doc_length': total_chars // total_docs if total_docs else 0,
             'sources_added': self.sources_added,
             'unique_content_hashes': len(self.content_hashes)
         }
@@ -374,7 +561,10 @@ class UnifiedIngestionManager:
         """
         logger.info("🧹 Clearing all documents")
         self.documents = []
+        self.source_codes = array('b')
+        self.total_chars = 0
         self.content_hashes = set()
+        self.lsh = self._new_lsh()
         self.sources_added = {
             'pdfs': [],
             'urls': [],
@@ -395,27 +585,32 @@ class UnifiedIngestionManager:
         """
         stats = self.get_statistics()
         
-        with open(output_file, 'w') as f:
-            f.write("="*60 + "\n")
-            f.write("INGESTION SUMMARY\n")
-            f.write(f"Generated: {datetime.now().isoformat()}\n")
-            f.write("="*60 + "\n\n")
-            
-            f.write(f"Total Documents: {stats['total_documents']}\n")
-            f.write(f"Total Characters: {stats['total_characters']:,}\n")
-            f.write(f"Average Document Length: {stats['average_doc_length']} chars\n\n")
-            
-            f.write("Documents by Source:\n")
-            for source, count in stats['by_source'].items():
-                f.write(f"  • {source.upper()}: {count}\n")
+        # Build the whole summary first, then write it in one call
+        # WHY? One write instead of dozens of small ones
+        lines = [
+            "="*60 + "\n",
+            "INGESTION SUMMARY\n",
+            f"Generated: {datetime.now().isoformat()}\n",
+            "="*60 + "\n\n",
             
-            f.write("\nSources Added:\n")
-            for source_type, paths in stats['sources_added'].items():
-                f.write(f"  • {source_type.upper()}:\n")
-                for path in paths:
-                    f.write(f"    - {path}\n")
+            f"Total Documents: {stats['total_documents']}\n",
+            f"Total Characters: {stats['total_characters']:,}\n",
+            f"Average Document Length: {stats['average_doc_length']} chars\n\n",
             
-            f.write(f"\nUnique Content Pieces: {stats['unique_content_hashes']}\n")
+            "Documents by Source:\n",
+        ]
+        for source, count in stats['by_source'].items():
+            lines.append(f"  • {source.upper()}: {count}\n")
+        
+        lines.append("\nSources Added:\n")
+        for source_type, paths in stats['sources_added'].items():
+            lines.append(f"  • {source_type.upper()}:\n")
+            lines.extend(f"    - {path}\n" for path in paths)
+        
+        lines.append(f"\nUnique Content Pieces: {stats['unique_content_hashes']}\n")
+        
+        # WHY utf-8? The bullets aren't in every platform's default encoding
+        Path(output_file).write_text(''.join(lines), encoding='utf-8')
         
         logger.info(f"📄 Summary exported to: {output_file}")
 
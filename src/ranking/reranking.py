@@ -19,13 +19,59 @@ WHY NOT JUST RETRIEVE 3 INITIALLY?
 - Strategy: Retrieve 10 fast → Re-rank to get best 3
 """
 
-from typing import List, Tuple
+from collections import OrderedDict
+from typing import List, Tuple, Union
 from llama_index.core.schema import NodeWithScore
+import numpy as np
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Batches up to this size are ranked with one full stable sort
+# WHY? For typical rerank sizes (tens of nodes) a single argsort
+# is faster than partitioning first
+FULL_SORT_MAX_NODES = 256
+
+
+class ScoredNodeBatch:
+    """
+    Retrieved nodes laid out as parallel arrays
+    
+    WHY?
+    - Re-ranking needs the same few fields from every node
+    - Pulling them out once lets the scores be numpy ops
+      over the whole batch instead of a per-node Python loop
+    - A batch can be re-ranked for several queries
+      (follow-ups, A/B comparisons) without rebuilding it
+    
+    FIELDS (index i is the same node everywhere):
+    - nodes: Original NodeWithScore objects
+    - texts: Node text
+    - lengths: Text length in characters
+    - orig_scores: Retrieval score (0.5 when missing)
+    - token_sets: Lowercased token set of each text
+    """
+    
+    def __init__(self, nodes: List[NodeWithScore], token_sets: List[frozenset]):
+        self.nodes = nodes
+        self.texts = [node.node.text for node in nodes]
+        self.lengths = np.fromiter(
+            (len(text) for text in self.texts), dtype=np.float64, count=len(nodes)
+        )
+        
+        # WHY 0.5? Neutral score when the retriever gave none
+        self.orig_scores = np.fromiter(
+            (node.score if hasattr(node, 'score') and node.score else 0.5 for node in nodes),
+            dtype=np.float64,
+            count=len(nodes)
+        )
+        self.token_sets = token_sets
+    
+    
+    def __len__(self) -> int:
+        return len(self.nodes)
+
 
 class SimpleReranker:
     """
@@ -52,7 +98,8 @@ class SimpleReranker:
         score_weight: float = 0.5,
         length_weight: float = 0.2,
         keyword_weight: float = 0.3,
-        ideal_length: int = 500
+        ideal_length: int = 500,
+        token_cache_size: int = 4096
     ):
         """
         Initialize re-ranker
@@ -62,6 +109,7 @@ class SimpleReranker:
         - length_weight: Weight for text length score  
         - keyword_weight: Weight for keyword overlap
         - ideal_length: Ideal text length in characters
+        - token_cache_size: How many nodes' token sets to remember
         
         WHY THESE WEIGHTS?
         - score_weight high: Trust the retrievers
@@ -73,6 +121,13 @@ class SimpleReranker:
         self.keyword_weight = keyword_weight
         self.ideal_length = ideal_length
         
+        # node_id -> (text, frozenset of lowercased tokens)
+        # WHY? The same nodes come back for repeated queries,
+        # so there's no need to re-split their text every time
+        # WHY OrderedDict? Cheap LRU - evict the oldest when full
+        self.token_cache_size = token_cache_size
+        self._token_cache: OrderedDict = OrderedDict()
+        
         # Normalize weights
         # WHY? Ensure they sum to 1.0
         total = score_weight + length_weight + keyword_weight
@@ -86,9 +141,9 @@ class SimpleReranker:
                    f"Keyword: {self.keyword_weight:.2f}")
     
     
-    def _score_length(self, text: str) -> float:
+    def _score_length(self, lengths: np.ndarray) -> np.ndarray:
         """
-        Score based on text length
+        Score based on text length (whole batch at once)
         
         WHY?
         - Too short: Incomplete information
@@ -105,25 +160,50 @@ class SimpleReranker:
         - text = 100 chars → score = 1 - 400/500 = 0.2 ❌
         - text = 1000 chars → score = 1 - 500/500 = 0.0 ❌
         
-        Returns: Score between 0 and 1
+        Returns: Scores between 0 and 1
+        """
+        diff = np.abs(lengths - self.ideal_length)
+        return np.maximum(0.0, 1.0 - diff / self.ideal_length)
+    
+    
+    def _get_tokens(self, node_id: str, text: str) -> frozenset:
+        """
+        Lowercased token set for a node, cached by node_id
+        
+        WHY KEEP THE TEXT?
+        - A node_id could be reused with edited text
+        - Comparing strings is far cheaper than re-tokenizing
         """
-        length = len(text)
-        diff = abs(length - self.ideal_length)
-        score = max(0.0, 1.0 - (diff / self.ideal_length))
-        return score
+        cached = self._token_cache.get(node_id)
+        if cached is not None and cached[0] == text:
+            self._token_cache.move_to_end(node_id)
+            return cached[1]
+        
+        # WHY lowercase? "CEO" and "ceo" should match
+        tokens = frozenset(text.lower().split())
+        self._token_cache[node_id] = (text, tokens)
+        self._token_cache.move_to_end(node_id)
+        if len(self._token_cache) > self.token_cache_size:
+            self._token_cache.popitem(last=False)
+        return tokens
     
     
-    def _score_keyword_overlap(self, query: str, text: str) -> float:
+    def _score_keyword_overlap(
+        self,
+        query_words: frozenset,
+        token_sets: List[frozenset]
+    ) -> np.ndarray:
         """
-        Score based on keyword overlap
+        Score based on keyword overlap (whole batch at once)
         
         WHY?
         - Ensure document actually relates to query
         - Simple but effective
         
         HOW:
-        - Extract keywords from query
-        - Count how many appear in text
+        - Keywords are extracted from the query once in rerank()
+        - Text tokens come from the batch (built via the token cache)
+        - Count how many appear in each text
         - Normalize by query length
         
         EXAMPLE:
@@ -131,87 +211,131 @@ class SimpleReranker:
         Text: "The CEO earns a salary of $200k in 2024"
         Keywords in text: CEO, salary, 2024 = 3/3 = 1.0 ✅
         
-        Returns: Score between 0 and 1
+        Returns: Scores between 0 and 1
         """
-        # Simple tokenization
-        # WHY lowercase? "CEO" and "ceo" should match
-        query_words = set(query.lower().split())
-        text_words = set(text.lower().split())
+        # WHY? Empty query has nothing to overlap with
+        if not query_words:
+            return np.zeros(len(token_sets))
         
         # Count overlapping keywords
-        overlap = len(query_words.intersection(text_words))
+        overlap = np.fromiter(
+            (len(query_words & text_words) for text_words in token_sets),
+            dtype=np.float64,
+            count=len(token_sets)
+        )
         
         # Normalize by query length
         # WHY? Longer queries naturally have more overlaps
-        if len(query_words) == 0:
-            return 0.0
+        return overlap / len(query_words)
+    
+    
+    def make_batch(self, nodes: List[NodeWithScore]) -> ScoredNodeBatch:
+        """
+        Build a ScoredNodeBatch, reusing cached token sets
+        
+        WHY A METHOD? Token sets come from this reranker's LRU cache
+        """
+        token_sets = [
+            self._get_tokens(node.node.node_id, node.node.text)
+            for node in nodes
+        ]
+        return ScoredNodeBatch(nodes, token_sets)
+    
+    
+    @staticmethod
+    def _top_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """
+        Indices of the top K scores (highest first)
+        
+        WHY NOT argsort EVERYTHING?
+        - np.partition finds the K-th best score in O(n)
+        - Only the K survivors get sorted
+        - Small batches still just argsort (cheaper there)
         
-        score = overlap / len(query_words)
-        return score
+        TIES: Earlier (better retrieved) nodes win, same as a stable sort
+        """
+        k = max(0, min(top_k, len(scores)))
+        if k == 0:
+            return np.empty(0, dtype=np.intp)
+        
+        if len(scores) <= FULL_SORT_MAX_NODES:
+            return np.argsort(-scores, kind='stable')[:k]
+        
+        if k < len(scores):
+            # Everything above the K-th best, then the first ties at it
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            above = np.flatnonzero(scores > kth)
+            ties = np.flatnonzero(scores == kth)[:k - len(above)]
+            candidates = np.sort(np.concatenate((above, ties)))
+        else:
+            candidates = np.arange(len(scores))
+        
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
     
     
     def rerank(
         self,
         query: str,
-        nodes: List[NodeWithScore],
+        nodes: Union[List[NodeWithScore], ScoredNodeBatch],
         top_k: int = 3
     ) -> List[NodeWithScore]:
         """
         Re-rank nodes by combined score
         
         PROCESS:
-        1. For each node, calculate:
+        1. For the whole batch, calculate:
            - Original score
            - Length score
            - Keyword score
         2. Combine with weights
-        3. Sort by combined score
-        4. Return top K
+        3. Keep the top K by combined score
         
         Parameters:
         - query: Original query
-        - nodes: Retrieved nodes with scores
+        - nodes: Retrieved nodes with scores, or a prebuilt batch
         - top_k: Number of results to return
         
         Returns: Re-ranked nodes (best first)
         """
         logger.info(f"🔄 Re-ranking {len(nodes)} nodes...")
         
-        reranked = []
-        
-        for node in nodes:
-            text = node.node.text
-            
-            # Get original score
-            # WHY? Trust the retriever's judgment
-            original_score = node.score if hasattr(node, 'score') and node.score else 0.5
-            
-            # Calculate additional scores
-            length_score = self._score_length(text)
-            keyword_score = self._score_keyword_overlap(query, text)
-            
-            # Combined score
-            # WHY WEIGHTED? Different signals have different importance
-            combined_score = (
-                self.score_weight * original_score +
-                self.length_weight * length_score +
-                self.keyword_weight * keyword_score
-            )
-            
-            # Create new NodeWithScore with combined score
-            # WHY NEW? Don't modify original
-            reranked_node = NodeWithScore(
-                node=node.node,
-                score=combined_score
-            )
-            reranked.append(reranked_node)
-        
-        # Sort by combined score (highest first)
-        # WHY REVERSE? Higher scores are better
-        reranked.sort(key=lambda x: x.score, reverse=True)
-        
-        # Return top K
-        result = reranked[:top_k]
+        batch = nodes if isinstance(nodes, ScoredNodeBatch) else self.make_batch(nodes)
+        
+        # Tokenize the query once for every node
+        # WHY? The query doesn't change between nodes
+        query_words = frozenset(query.lower().split())
+        
+        # Score + length part of the combined score
+        # WHY WEIGHTED? Different signals have different importance
+        partial = (
+            self.score_weight * batch.orig_scores +
+            self.length_weight * self._score_length(batch.lengths)
+        )
+        
+        # Prune nodes that can't make the top K
+        # WHY? Keyword overlap is the only per-node Python work, and
+        # it adds at most keyword_weight. The K-th best partial score
+        # is already a floor for the top K, so anything whose best
+        # case stays below it is a guaranteed loser
+        candidates = np.arange(len(batch))
+        if 0 < top_k < len(batch) and self.keyword_weight > 0 and query_words:
+            kth = np.partition(partial, len(batch) - top_k)[len(batch) - top_k]
+            candidates = np.flatnonzero(partial + self.keyword_weight >= kth)
+        
+        keyword_scores = np.zeros(len(batch))
+        keyword_scores[candidates] = self._score_keyword_overlap(
+            query_words, [batch.token_sets[idx] for idx in candidates]
+        )
+        
+        # Pruned nodes keep keyword 0 - still below every survivor
+        combined = partial + self.keyword_weight * keyword_scores
+        
+        # Create new NodeWithScore only for the survivors
+        # WHY NEW? Don't modify original
+        result = [
+            NodeWithScore(node=batch.nodes[idx].node, score=float(combined[idx]))
+            for idx in self._top_indices(combined, top_k)
+        ]
         
         logger.info(f"✅ Re-ranked to top {len(result)} nodes")
         return result
@@ -23,27 +23,81 @@ from llama_index.core import (
     load_index_from_storage,
     Settings
 )
-from llama_index.core.schema import Document, QueryBundle
+from llama_index.core.schema import Document, NodeWithScore, QueryBundle
 from llama_index.llms.openai import OpenAI
-from llama_index.embeddings.openai import OpenAIEmbedding
 from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 import logging
+import re
+import threading
 import time
 
 # Load environment
 load_dotenv()
 
 # Import our custom retrievers
+# (project root added only when run as a script)
 import sys
-project_root = Path(__file__).parent.parent.parent
-sys.path.insert(0, str(project_root))
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from src.retrieval.bm25_retriever import BM25Retriever
+from src.retrieval.embedding_cache import CachedOpenAIEmbedding
 from src.retrieval.hybrid_retriever import HybridRetriever
+from src.retrieval.storage_json import enable_fast_storage_json
+from src.retrieval.faiss_store import (
+    LazyFaissVectorStore,
+    FAISS_AVAILABLE,
+    FAISS_MARKER_FILE,
+    faiss_insert_batch_size
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# How many (mode, question) retrievals to remember
+# WHY? Repeats (compare_modes, follow-ups, reruns in the UI)
+# skip the embedding call and search entirely
+RETRIEVAL_CACHE_SIZE = 1024
+
+# A question that is only a "quoted phrase" asks for exact wording
+QUOTED_QUERY = re.compile(r'"([^"]+)"')
+
+
+@lru_cache(maxsize=8)
+def _get_models(
+    model: str,
+    embedding_model: str,
+    temperature: float,
+    embed_batch_size: int = 100
+):
+    """
+    Build (or reuse) the LLM and embedding clients
+    
+    WHY CACHED?
+    - Each client owns its own HTTP connection pool
+    - Rebuilding the engine (new upload, new session) shouldn't
+      throw those pools away
+    - Same settings → same clients, once per process
+    
+    WHY embed_batch_size?
+    - Each embedding request carries this many chunks
+    - 1000 chunks = 10 HTTP round trips instead of 100
+    
+    WHY CachedOpenAIEmbedding?
+    - Chunks embedded on an earlier run are read from disk
+    
+    Returns: (llm, embed_model)
+    """
+    llm = OpenAI(model=model, temperature=temperature)
+    embed_model = CachedOpenAIEmbedding(
+        model=embedding_model,
+        embed_batch_size=embed_batch_size
+    )
+    return llm, embed_model
+
 
 class AdvancedQueryEngine:
     """
@@ -66,7 +120,9 @@ class AdvancedQueryEngine:
         storage_dir: str = "storage",
         model: str = "gpt-3.5-turbo",
         embedding_model: str = "text-embedding-ada-002",
-        temperature: float = 0.1
+        temperature: float = 0.1,
+        embed_batch_size: int = 100,
+        faiss_index_type: Optional[str] = "hnsw"
     ):
         """
         Initialize advanced query engine
@@ -76,12 +132,22 @@ class AdvancedQueryEngine:
         - model: LLM for generation
         - embedding_model: Model for embeddings
         - temperature: Response randomness
+        - embed_batch_size: Chunks sent per embedding request
+        - faiss_index_type: FAISS index for new indexes ("hnsw", "ivfpq", "sq8", "fp16", "flat_fp16")
+          WHY? Sub-linear search instead of comparing every vector
+          (None, or faiss not installed = LlamaIndex's default store)
         """
+        # WHY? Loading/saving the docstore JSON is faster with orjson
+        enable_fast_storage_json()
+        
         self.storage_dir = Path(storage_dir)
+        self.faiss_index_type = faiss_index_type if FAISS_AVAILABLE else None
         
         # Configure LlamaIndex
-        Settings.llm = OpenAI(model=model, temperature=temperature)
-        Settings.embed_model = OpenAIEmbedding(model=embedding_model)
+        # WHY _get_models? Reuses clients already built for these settings
+        Settings.llm, Settings.embed_model = _get_models(
+            model, embedding_model, temperature, embed_batch_size
+        )
         
         self.index = None
         self.nodes = None
@@ -89,9 +155,18 @@ class AdvancedQueryEngine:
         self.bm25_retriever = None
         self.hybrid_retriever = None
         
+        # (mode, question) → ((node_id, score), ...)
+        # WHY IDS NOT NODES? The nodes already live in self.nodes,
+        # so cache entries stay tiny
+        self._retrieval_cache: OrderedDict = OrderedDict()
+        self._retrieval_cache_lock = threading.Lock()
+        self._answers_lock = threading.Lock()
+        self._nodes_by_id: Dict[str, object] = {}
+        
         logger.info("🎯 Advanced Query Engine initialized")
         logger.info(f"   Model: {model}")
         logger.info(f"   Storage: {storage_dir}")
+        logger.info(f"   Vector store: {f'FAISS ({self.faiss_index_type})' if self.faiss_index_type else 'default'}")
     
     
     def load_or_create_index(
@@ -112,8 +187,14 @@ class AdvancedQueryEngine:
         # Try to load existing index
         if (self.storage_dir / "docstore.json").exists():
             logger.info(f"📂 Loading existing index from {self.storage_dir}...")
+            # Saved with FAISS? Then the vector file is a FAISS index
+            vector_store = None
+            if (self.storage_dir / FAISS_MARKER_FILE).exists():
+                vector_store = LazyFaissVectorStore.from_persist_dir(str(self.storage_dir))
+            
             storage_context = StorageContext.from_defaults(
-                persist_dir=str(self.storage_dir)
+                persist_dir=str(self.storage_dir),
+                vector_store=vector_store
             )
             self.index = load_index_from_storage(storage_context)
             logger.info("✅ Index loaded!")
@@ -125,11 +206,22 @@ class AdvancedQueryEngine:
                 )
             
             logger.info(f"🔨 Creating new index from {len(documents)} documents...")
+            vector_store = None
+            if self.faiss_index_type:
+                logger.info(f"🧱 Using FAISS ({self.faiss_index_type}) vector store")
+                vector_store = LazyFaissVectorStore(index_type=self.faiss_index_type)
+            
             self.index = VectorStoreIndex.from_documents(
                 documents,
+                storage_context=StorageContext.from_defaults(vector_store=vector_store),
+                # WHY? Trained FAISS indexes must see the whole corpus at once
+                insert_batch_size=faiss_insert_batch_size(self.faiss_index_type),
                 show_progress=True
             )
             self.index.storage_context.persist(persist_dir=str(self.storage_dir))
+            
+            if self.faiss_index_type:
+                (self.storage_dir / FAISS_MARKER_FILE).write_text(self.faiss_index_type)
             logger.info("✅ Index created and saved!")
         
         # Extract nodes for BM25
@@ -156,11 +248,18 @@ class AdvancedQueryEngine:
         """
         logger.info("🔧 Setting up retrievers...")
         
+        # New retrievers = old cached results may be wrong
+        with self._retrieval_cache_lock:
+            self._retrieval_cache.clear()
+        self._nodes_by_id = {node.node_id: node for node in self.nodes}
+        
         # 1. Vector retriever (semantic search)
         # WHY? Understands meaning and context
         self.vector_retriever = self.index.as_retriever(
             similarity_top_k=similarity_top_k
         )
+        if isinstance(self.index.vector_store, LazyFaissVectorStore):
+            self.index.vector_store.set_top_k(similarity_top_k)
         logger.info("   ✅ Vector retriever ready")
         
         # 2. BM25 retriever (keyword search)
@@ -183,6 +282,48 @@ class AdvancedQueryEngine:
         logger.info("✅ All retrievers initialized!")
     
     
+    def _retrieve(self, mode: str, question: str) -> List[NodeWithScore]:
+        """
+        Retrieve for (mode, question), remembering the result
+        
+        WHY?
+        - Retrieval means an embedding API call + index search
+        - The same question is often asked again (compare_modes,
+          re-running a query in the UI)
+        
+        Returns: Retrieved nodes (fresh NodeWithScore objects)
+        """
+        key = (mode, question)
+        with self._retrieval_cache_lock:
+            cached = self._retrieval_cache.get(key)
+            if cached is not None:
+                self._retrieval_cache.move_to_end(key)
+        
+        if cached is None:
+            retriever = {
+                "vector": self.vector_retriever,
+                "bm25": self.bm25_retriever,
+                "hybrid": self.hybrid_retriever
+            }[mode]
+            retrieved_nodes = retriever.retrieve(QueryBundle(query_str=question))
+            
+            # WHY CHECK IDS? Only cache what we can rebuild
+            if all(node.node.node_id in self._nodes_by_id for node in retrieved_nodes):
+                with self._retrieval_cache_lock:
+                    self._retrieval_cache[key] = tuple(
+                        (node.node.node_id, node.score) for node in retrieved_nodes
+                    )
+                    if len(self._retrieval_cache) > RETRIEVAL_CACHE_SIZE:
+                        self._retrieval_cache.popitem(last=False)
+            return retrieved_nodes
+        
+        logger.info("♻️  Using cached retrieval")
+        return [
+            NodeWithScore(node=self._nodes_by_id[node_id], score=score)
+            for node_id, score in cached
+        ]
+    
+    
     def query(
         self,
         question: str,
@@ -198,6 +339,11 @@ class AdvancedQueryEngine:
         - "bm25": Keyword search only
         - "hybrid": Fusion of both (recommended!)
         
+        LITERAL QUERIES:
+        - A question that is just a "quoted phrase" wants exact words
+        - Hybrid goes straight to BM25 for it (skips the embedding
+          call and fusion); the quotes are dropped before retrieval
+        
         WHY DIFFERENT MODES?
         - Flexibility for different use cases
         - Performance comparison
@@ -211,6 +357,55 @@ class AdvancedQueryEngine:
         
         Returns: Dict with answer, sources, timing
         """
+        return self._run_query(question, mode, verbose)
+    
+    
+    def _generate(self, prompt: str, answers: Optional[Dict[str, Future]] = None) -> str:
+        """
+        Get the LLM's answer for a prompt
+        
+        WHY answers?
+        - compare_modes runs modes side by side; two modes that
+          retrieved the same nodes build the exact same prompt
+        - The first one asks the LLM, the others wait for its answer
+          (one API call instead of two or three)
+        
+        Parameters:
+        - prompt: Full prompt text
+        - answers: Shared prompt → Future map (None = always call)
+        
+        Returns: Answer text
+        """
+        if answers is None:
+            return str(Settings.llm.complete(prompt))
+        
+        with self._answers_lock:
+            future = answers.get(prompt)
+            is_first = future is None
+            if is_first:
+                future = answers[prompt] = Future()
+        
+        if is_first:
+            try:
+                future.set_result(str(Settings.llm.complete(prompt)))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            logger.info("♻️  Same prompt as another mode - sharing its answer")
+        
+        return future.result()
+    
+    
+    def _run_query(
+        self,
+        question: str,
+        mode: str,
+        verbose: bool,
+        answers: Optional[Dict[str, Future]] = None
+    ) -> Dict:
+        """
+        query() body; compare_modes passes a shared answers map
+        """
         if not self.index:
             raise ValueError("Index not loaded. Call load_or_create_index() first.")
         
@@ -225,7 +420,13 @@ class AdvancedQueryEngine:
         if mode not in retrievers:
             raise ValueError(f"Invalid mode: {mode}. Choose from: {list(retrievers.keys())}")
         
-        retriever = retrievers[mode]
+        # Quoted phrase? Retrieve the words, not the quote marks
+        # WHY? The tokenizer would glue quotes onto the first/last word
+        literal = QUOTED_QUERY.fullmatch(question.strip())
+        search_text = literal.group(1) if literal else question
+        if literal and mode == "hybrid":
+            logger.info("🔤 Quoted phrase - using BM25 instead of hybrid")
+            mode = "bm25"
         
         if verbose:
             logger.info(f"🔍 Querying with mode: {mode.upper()}")
@@ -236,8 +437,8 @@ class AdvancedQueryEngine:
         start_time = time.time()
         
         # Retrieve relevant documents
-        query_bundle = QueryBundle(query_str=question)
-        retrieved_nodes = retriever.retrieve(query_bundle)
+        # WHY _retrieve? Repeated questions reuse earlier results
+        retrieved_nodes = self._retrieve(mode, search_text)
         
         retrieval_time = time.time() - start_time
         
@@ -270,8 +471,7 @@ Question: {question}
 Answer:"""
         
         # Get LLM response
-        llm = Settings.llm
-        response = llm.complete(prompt)
+        response = self._generate(prompt, answers)
         
         generation_time = time.time() - start_time
         
@@ -323,6 +523,12 @@ Answer:"""
             "hybrid": {"answer": "...", "time": 0.8}
         }
         
+        WHY THREADS?
+        - Each mode waits on the network (embedding + LLM calls)
+        - Running them side by side takes about as long as the
+          slowest mode instead of the sum of all of them
+        - Modes that retrieve the same nodes share one LLM call
+        
         Parameters:
         - question: Question to test
         - modes: List of modes to compare
@@ -331,11 +537,22 @@ Answer:"""
         """
         logger.info(f"🔬 Comparing modes for: {question}")
         
-        results = {}
-        for mode in modes:
-            logger.info(f"\n--- Testing {mode.upper()} mode ---")
-            result = self.query(question, mode=mode, verbose=False)
-            results[mode] = result
+        if not modes:
+            return {}
+        
+        # prompt → answer, shared by all modes of this comparison
+        answers: Dict[str, Future] = {}
+        
+        with ThreadPoolExecutor(max_workers=len(modes)) as executor:
+            futures = {}
+            for mode in modes:
+                logger.info(f"\n--- Testing {mode.upper()} mode ---")
+                futures[mode] = executor.submit(
+                    self._run_query, question, mode, False, answers
+                )
+            
+            # WHY DICT ORDER? Results come back in the order asked for
+            results = {mode: future.result() for mode, future in futures.items()}
         
         return results
 
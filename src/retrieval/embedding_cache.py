@@ -0,0 +1,261 @@
+"""
+On-Disk Embedding Cache
+
+WHY THIS EXISTS:
+- Building an index embeds every chunk through the OpenAI API
+- Re-running ingestion re-sends chunks that haven't changed
+  (same text → same vector, every time)
+- Caching by content means reruns only pay for new chunks
+
+HOW IT WORKS:
+- Each chunk's vector is saved as <cache_dir>/<sha256>.npy
+- The hash covers model + dimensions + text, so switching
+  models never reuses the wrong vectors
+- Only cache misses are sent to the API, in one batch, and
+  duplicate chunks (e.g. scraped boilerplate) only once
+- Questions are remembered in memory (small LRU), so asking
+  the same thing again skips the embedding call entirely
+- All instances share one pooled HTTP client, so connections
+  (and their TLS handshakes) are reused between calls
+"""
+
+from typing import Any, List, Optional, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import logging
+import os
+import threading
+import httpx
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.embeddings.openai import OpenAIEmbedding
+
+# HTTP/2 support for httpx (optional dependency)
+# WHY? Concurrent batch requests share one multiplexed connection
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Where chunk embeddings are kept between runs
+EMBEDDING_CACHE_DIR = ".cache/embeddings"
+
+# How many question embeddings to keep in memory
+QUERY_CACHE_SIZE = 1024
+
+# Connection pool size for the shared HTTP client
+# WHY 32? Room for parallel embedding batches without queueing
+HTTP_MAX_CONNECTIONS = 32
+
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+
+def _get_http_client() -> httpx.Client:
+    """
+    One keep-alive HTTP client for every embedding model
+    
+    WHY SHARED?
+    - Each new client starts with an empty pool (new TCP + TLS handshakes)
+    - Engines and managers each build their own embedding model
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_CONNECTIONS
+                ),
+                timeout=httpx.Timeout(60.0)
+            )
+        return _http_client
+
+
+class CachedOpenAIEmbedding(OpenAIEmbedding):
+    """
+    OpenAIEmbedding that remembers chunk embeddings on disk
+    
+    WHY SUBCLASS?
+    - Drop-in replacement wherever OpenAIEmbedding is used
+    - Only the batch text and query methods change
+    
+    WHY ARE QUESTIONS ONLY CACHED IN MEMORY?
+    - Repeats happen within a session (retries, compare_modes,
+      the same demo question) - no need to keep them forever
+    """
+    
+    _cache_dir: Optional[Path] = PrivateAttr(default=None)
+    _query_cache: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _query_cache_lock: Any = PrivateAttr(default_factory=threading.Lock)
+    
+    def __init__(self, cache_dir: Optional[str] = EMBEDDING_CACHE_DIR, **kwargs: Any):
+        """
+        Initialize embedding model
+        
+        Parameters:
+        - cache_dir: Folder for cached vectors (None = no caching)
+        - **kwargs: Passed to OpenAIEmbedding (model, embed_batch_size, ...)
+        """
+        kwargs.setdefault("http_client", _get_http_client())
+        super().__init__(**kwargs)
+        self._cache_dir = Path(cache_dir) if cache_dir else None
+    
+    
+    def _cache_path(self, text: str) -> Path:
+        """
+        Cache file for one text
+        
+        WHY SHA-256 OVER MODEL + DIMENSIONS + TEXT?
+        - Same text embedded by another model is a different vector
+        """
+        digest = hashlib.sha256(f"{self.model_name}:{self.dimensions}:".encode())
+        digest.update(text.encode("utf-8", "surrogatepass"))
+        return self._cache_dir / f"{digest.hexdigest()}.npy"
+    
+    
+    def _lookup(self, texts: List[str]) -> Tuple[List[Optional[List[float]]], List[int]]:
+        """
+        Load whatever is cached
+        
+        Returns: (embeddings with None for misses, indices of the misses)
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        if self._cache_dir is None:
+            return embeddings, list(range(len(texts)))
+        
+        misses = []
+        for i, text in enumerate(texts):
+            try:
+                embeddings[i] = np.load(self._cache_path(text)).tolist()
+            except FileNotFoundError:
+                misses.append(i)
+            except Exception as e:
+                logger.warning(f"⚠️  Ignoring unreadable embedding cache entry: {str(e)}")
+                misses.append(i)
+        
+        if len(misses) < len(texts):
+            logger.info(f"♻️  Reusing {len(texts) - len(misses)}/{len(texts)} cached embeddings")
+        return embeddings, misses
+    
+    
+    def _store(self, texts: List[str], embeddings: List[List[float]]) -> None:
+        """
+        Save fresh embeddings for the next run
+        
+        WHY WRITE TO A TEMP FILE FIRST?
+        - An interrupted write never leaves a half-written vector behind
+        """
+        if self._cache_dir is None:
+            return
+        
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            for text, embedding in zip(texts, embeddings):
+                cache_path = self._cache_path(text)
+                tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, np.asarray(embedding, dtype=np.float64))
+                os.replace(tmp_path, cache_path)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not write embedding cache: {str(e)}")
+    
+    
+    @staticmethod
+    def _fill_misses(
+        texts: List[str],
+        embeddings: List[Optional[List[float]]],
+        misses: List[int],
+        missing_texts: List[str],
+        fresh: List[List[float]]
+    ) -> None:
+        """
+        Put freshly embedded vectors back at every position that needed them
+        
+        WHY? A text repeated in the batch was embedded once,
+        but each copy still gets its own list
+        """
+        by_text = dict(zip(missing_texts, fresh))
+        for i in misses:
+            embeddings[i] = list(by_text[texts[i]])
+    
+    
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch, only calling the API for uncached texts
+        """
+        embeddings, misses = self._lookup(texts)
+        if misses:
+            # WHY dict.fromkeys? Duplicate chunks are only sent once
+            missing_texts = list(dict.fromkeys(texts[i] for i in misses))
+            fresh = super()._get_text_embeddings(missing_texts)
+            self._store(missing_texts, fresh)
+            self._fill_misses(texts, embeddings, misses, missing_texts, fresh)
+        return embeddings
+    
+    
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Async version of _get_text_embeddings
+        """
+        embeddings, misses = self._lookup(texts)
+        if misses:
+            # WHY dict.fromkeys? Duplicate chunks are only sent once
+            missing_texts = list(dict.fromkeys(texts[i] for i in misses))
+            fresh = await super()._aget_text_embeddings(missing_texts)
+            self._store(missing_texts, fresh)
+            self._fill_misses(texts, embeddings, misses, missing_texts, fresh)
+        return embeddings
+    
+    
+    def _cached_query(self, query: str) -> Optional[List[float]]:
+        """
+        Question embedding from the in-memory LRU (None on a miss)
+        """
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(query)
+            if embedding is None:
+                return None
+            self._query_cache.move_to_end(query)
+        
+        # WHY A COPY? Callers may modify the list they get back
+        return list(embedding)
+    
+    
+    def _remember_query(self, query: str, embedding: List[float]) -> None:
+        """
+        Add a question embedding to the LRU, evicting the oldest
+        """
+        with self._query_cache_lock:
+            self._query_cache[query] = tuple(embedding)
+            self._query_cache.move_to_end(query)
+            if len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+    
+    
+    def _get_query_embedding(self, query: str) -> List[float]:
+        """
+        Embed a question, reusing it if it was asked before
+        """
+        embedding = self._cached_query(query)
+        if embedding is None:
+            embedding = super()._get_query_embedding(query)
+            self._remember_query(query, embedding)
+        return embedding
+    
+    
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        """
+        Async version of _get_query_embedding
+        """
+        embedding = self._cached_query(query)
+        if embedding is None:
+            embedding = await super()._aget_query_embedding(query)
+            self._remember_query(query, embedding)
+        return embedding
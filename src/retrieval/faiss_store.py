@@ -0,0 +1,232 @@
+"""
+FAISS Vector Store
+
+WHY THIS EXISTS:
+- LlamaIndex's default vector store compares the question
+  against EVERY stored vector (O(N) per query)
+- FAISS indexes (HNSW, IVF-PQ) only visit a small part of the
+  collection, so queries stay fast as the corpus grows
+- Optional: everything falls back to the default store when
+  faiss is not installed
+
+INDEX TYPES:
+- "hnsw": Graph index, near-exact results, no training needed
+- "ivfpq": Clustered + compressed vectors for very large corpora
+  (a 1536-dim vector takes 64 bytes instead of 6 KB)
+- "sq8": HNSW over int8 vectors (4x less memory, trained min/max)
+- "fp16": HNSW over float16 vectors (2x less memory, no training)
+- "flat_fp16": Exact scan over float16 vectors (no graph, 2x less
+  memory to stream per query than float32)
+"""
+
+from typing import Any, List, Optional
+from dataclasses import replace
+import math
+import logging
+import sys
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+
+try:
+    import faiss
+    from llama_index.vector_stores.faiss import FaissVectorStore
+    FAISS_AVAILABLE = True
+except ImportError:
+    FaissVectorStore = object
+    FAISS_AVAILABLE = False
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Supported index types
+FAISS_INDEX_TYPES = ("hnsw", "ivfpq", "sq8", "fp16", "flat_fp16")
+
+# Written next to the saved index so it is reloaded with FAISS
+# WHY? LlamaIndex saves both stores under the same file name
+FAISS_MARKER_FILE = "faiss_index_type.txt"
+
+# IVF-PQ needs enough vectors to learn its clusters and codebooks
+# WHY 256? Each PQ sub-quantizer learns 2^8 = 256 centroids
+MIN_IVFPQ_TRAINING_VECTORS = 256
+
+# Index types that are sized and trained on their first add() call
+# (sq8 learns its int8 min/max range; vectors inserted later
+#  that fall outside it are clipped)
+TRAINED_INDEX_TYPES = ("ivfpq", "sq8")
+
+# LlamaIndex's default number of nodes per add() call
+DEFAULT_INSERT_BATCH_SIZE = 2048
+
+# HNSW search breadth (candidates kept while walking the graph)
+# WHY 64? Near-exact recall for small K; widened for larger K
+HNSW_EF_SEARCH = 64
+
+# IVF clusters searched per query (at least)
+# WHY 8? Enough clusters for good recall while skipping most of the index
+IVF_NPROBE = 8
+
+
+def build_faiss_index(index_type: str, dim: int, n_vectors: int):
+    """
+    Create an empty FAISS index
+    
+    WHY INNER PRODUCT?
+    - Vectors are normalized before they are added
+    - Inner product of unit vectors = cosine similarity,
+      the same score the default vector store reports
+    
+    Parameters:
+    - index_type: One of FAISS_INDEX_TYPES
+    - dim: Embedding dimension
+    - n_vectors: How many vectors the first batch has (sizes IVF-PQ)
+    
+    Returns: faiss.Index (may still need training)
+    """
+    if index_type not in FAISS_INDEX_TYPES:
+        raise ValueError(f"Invalid FAISS index type: {index_type}. Choose from: {list(FAISS_INDEX_TYPES)}")
+    
+    if index_type == "ivfpq":
+        if n_vectors >= MIN_IVFPQ_TRAINING_VECTORS:
+            # ~4·√N clusters, search 1/16th of them per query
+            nlist = max(1, min(1024, int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+            
+            # Sub-quantizers must split the dimension evenly
+            m = max(m for m in range(1, 65) if dim % m == 0)
+            
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+            index.nprobe = min(nlist, max(IVF_NPROBE, nlist // 16))
+            logger.info(f"   IVF-PQ: {n_vectors} vectors → nlist={nlist}, nprobe={index.nprobe}, m={m}")
+            return index
+        
+        logger.warning(f"⚠️  Only {n_vectors} vectors - too few to train IVF-PQ, using HNSW")
+    
+    if index_type == "flat_fp16":
+        # Exact search, every vector compared
+        # WHY FP16? A flat scan is memory-bound, half the bytes = ~half the time
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+    
+    if index_type in ("sq8", "fp16"):
+        # Same graph search, smaller vectors
+        # WHY? Less memory per vector = more of the index fits in cache
+        qtype = faiss.ScalarQuantizer.QT_8bit if index_type == "sq8" else faiss.ScalarQuantizer.QT_fp16
+        index = faiss.IndexHNSWSQ(dim, qtype, 32, faiss.METRIC_INNER_PRODUCT)
+    else:
+        index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+    
+    index.hnsw.efConstruction = 200
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
+
+
+def faiss_insert_batch_size(index_type: Optional[str]) -> int:
+    """
+    How many nodes VectorStoreIndex should pass to add() at once
+    
+    WHY?
+    - A trained index picks its settings from the first add() call only
+      (IVF-PQ: nlist + codebooks, sq8: the value range each int8 covers)
+    - With LlamaIndex's 2048-node batches that would size a 100k-vector
+      index as if it had 2048 vectors
+    - One batch = trained on the whole corpus (all embeddings are held
+      in memory once while building)
+    
+    Returns: Value for VectorStoreIndex(insert_batch_size=...)
+    """
+    if index_type in TRAINED_INDEX_TYPES:
+        return sys.maxsize
+    return DEFAULT_INSERT_BATCH_SIZE
+
+
+class LazyFaissVectorStore(FaissVectorStore):
+    """
+    FAISS vector store that builds its index on the first insert
+    
+    WHY LAZY?
+    - The embedding dimension is only known once vectors arrive
+    - IVF-PQ and int8 have to be trained on real vectors before adding them
+      (on the first add() - see faiss_insert_batch_size)
+    
+    WHY OVERRIDE add()?
+    - The base class adds vectors one at a time
+    - Adding the whole batch in one call is much faster
+    """
+    
+    _index_type: str = PrivateAttr()
+    
+    def __init__(self, index_type: str = "hnsw", faiss_index: Any = None):
+        """
+        Initialize store
+        
+        Parameters:
+        - index_type: One of FAISS_INDEX_TYPES (used when creating)
+        - faiss_index: Existing index (when loading from disk)
+        """
+        if not FAISS_AVAILABLE:
+            raise ImportError(
+                "FAISS backend requires `pip install faiss-cpu llama-index-vector-stores-faiss`"
+            )
+        super().__init__(faiss_index=faiss_index)
+        self._index_type = index_type
+    
+    
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        """
+        Add nodes (with embeddings) to the index in one batch
+        
+        Returns: Position of each vector, used as its id
+        """
+        if not nodes:
+            return []
+        
+        vectors = np.array([node.get_embedding() for node in nodes], dtype="float32")
+        faiss.normalize_L2(vectors)
+        
+        if self._faiss_index is None:
+            self._faiss_index = build_faiss_index(self._index_type, vectors.shape[1], len(vectors))
+            logger.info(f"🧱 Created FAISS {type(self._faiss_index).__name__} (dim={vectors.shape[1]})")
+        
+        if not self._faiss_index.is_trained:
+            self._faiss_index.train(vectors)
+        
+        start = self._faiss_index.ntotal
+        self._faiss_index.add(vectors)
+        return [str(i) for i in range(start, start + len(vectors))]
+    
+    
+    def set_top_k(self, top_k: int):
+        """
+        Widen the HNSW search to suit how many results are wanted
+        
+        WHY?
+        - HNSW can't return more than efSearch good candidates
+        - ~4x K keeps recall high without visiting the whole graph
+        """
+        hnsw = getattr(self._faiss_index, "hnsw", None)
+        if hnsw is not None:
+            hnsw.efSearch = max(HNSW_EF_SEARCH, 4 * top_k)
+    
+    
+    def set_nprobe(self, nprobe: int):
+        """
+        Choose how many IVF clusters each query searches
+        
+        WHY?
+        - More clusters = better recall, slower queries
+        - Lets callers trade one for the other without rebuilding
+        """
+        ivf = faiss.try_extract_index_ivf(self._faiss_index) if self._faiss_index is not None else None
+        if ivf is not None:
+            ivf.nprobe = max(1, min(ivf.nlist, nprobe))
+    
+    
+    def query(self, query, **kwargs: Any):
+        """
+        Search with a normalized question embedding
+        
+        WHY? Stored vectors are unit length, the question must match
+        """
+        embedding = np.array(query.query_embedding, dtype="float32")[np.newaxis, :]
+        faiss.normalize_L2(embedding)
+        return super().query(replace(query, query_embedding=embedding[0].tolist()), **kwargs)
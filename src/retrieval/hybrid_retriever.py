@@ -22,7 +22,10 @@ Fused results:    [Doc A, Doc B, Doc C, Doc D]
 from typing import List, Dict
 from llama_index.core.schema import NodeWithScore, QueryBundle
 from llama_index.core.retrievers import BaseRetriever
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+import asyncio
+import heapq
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -77,10 +80,35 @@ class HybridRetriever(BaseRetriever):
         
         self._weights = weights
         
+        # RRF constant → per-retriever score for each rank (filled on first use)
+        # WHY? The same weight / (k + rank) values are needed on every query
+        self._rrf_tables: Dict[int, List[List[float]]] = {}
+        
         logger.info(f"🔀 Hybrid Retriever initialized with {len(retrievers)} retrievers")
         logger.info(f"   Weights: {weights}")
     
     
+    def _get_rrf_tables(self, k: int, max_rank: int) -> List[List[float]]:
+        """
+        Reciprocal rank scores for each retriever, ranks 1..max_rank
+        
+        WHY CACHE?
+        - Computed once, then every query just reads them
+        - Regrown (doubled) only if a retriever returns more results
+        """
+        tables = self._rrf_tables.get(k)
+        if tables is None or len(tables[0]) < max_rank:
+            size = max(max_rank, 2 * len(tables[0]) if tables else 64)
+            
+            # WHY 1/(k+rank)? Higher ranks get higher scores
+            tables = [
+                [weight * (1.0 / (k + rank)) for rank in range(1, size + 1)]
+                for weight in self._weights
+            ]
+            self._rrf_tables[k] = tables
+        return tables
+    
+    
     def _reciprocal_rank_fusion(
         self,
         results_list: List[List[NodeWithScore]],
@@ -114,40 +142,39 @@ class HybridRetriever(BaseRetriever):
         
         Returns: Fused and re-ranked results
         """
-        # Dictionary to accumulate scores
-        # WHY DEFAULTDICT? Automatically initializes new entries
-        node_scores = defaultdict(float)
-        node_map = {}  # Store actual nodes
+        # node_id → [node, fused score]
+        # WHY ONE DICT? One lookup per hit, and the node is stored once
+        entries = {}
+        
+        # Reciprocal rank score for every position, per retriever
+        rrf_tables = self._get_rrf_tables(k, max(map(len, results_list), default=0))
         
         # Process each retriever's results
-        for weight, results in zip(self._weights, results_list):
-            for rank, node_with_score in enumerate(results, start=1):
-                node_id = node_with_score.node.node_id
-                
-                # Reciprocal rank score
-                # WHY 1/(k+rank)? Higher ranks get higher scores
-                rrf_score = weight * (1.0 / (k + rank))
-                
-                node_scores[node_id] += rrf_score
-                node_map[node_id] = node_with_score.node
-        
-        # Sort by fused score
-        # WHY SORT? We want best results first
-        sorted_nodes = sorted(
-            node_scores.items(),
-            key=lambda x: x[1],
-            reverse=True
+        for rrf_scores, results in zip(rrf_tables, results_list):
+            for rrf_score, node_with_score in zip(rrf_scores, results):
+                node = node_with_score.node
+                entry = entries.get(node.node_id)
+                if entry is None:
+                    entries[node.node_id] = [node, rrf_score]
+                else:
+                    entry[1] += rrf_score
+        
+        # Keep the best K by fused score
+        # WHY nlargest? No need to sort results we'll throw away
+        # (ties keep first-seen order, same as a stable sort)
+        # WHY NOT np.argpartition? Copying the scores into an array
+        # costs more than nlargest's whole selection, at any size
+        top_entries = heapq.nlargest(
+            self._similarity_top_k,
+            entries.values(),
+            key=itemgetter(1)
         )
         
         # Create result list
-        fused_results = []
-        for node_id, score in sorted_nodes[:self._similarity_top_k]:
-            fused_results.append(
-                NodeWithScore(
-                    node=node_map[node_id],
-                    score=score
-                )
-            )
+        fused_results = [
+            NodeWithScore(node=node, score=score)
+            for node, score in top_entries
+        ]
         
         return fused_results
     
@@ -157,7 +184,7 @@ class HybridRetriever(BaseRetriever):
         Retrieve using all retrievers and fuse results
         
         PROCESS:
-        1. Query each retriever
+        1. Query each retriever (concurrently)
         2. Collect all results
         3. Fuse using RRF
         4. Return top K
@@ -170,14 +197,19 @@ class HybridRetriever(BaseRetriever):
         query_text = query_bundle.query_str
         logger.info(f"🔍 Hybrid retrieval for: {query_text}")
         
-        # Query all retrievers
+        # Query all retrievers at the same time
         # WHY SEPARATE? Each retriever uses different strategy
-        all_results = []
-        for i, retriever in enumerate(self._retrievers):
-            logger.info(f"   Querying retriever {i+1}/{len(self._retrievers)}...")
-            results = retriever._retrieve(query_bundle)
-            all_results.append(results)
-            logger.info(f"   Found {len(results)} results")
+        # WHY THREADS? Vector search waits on the embedding API;
+        # BM25 can run meanwhile, so total time is the slowest one
+        logger.info(f"   Querying {len(self._retrievers)} retrievers...")
+        with ThreadPoolExecutor(max_workers=len(self._retrievers)) as executor:
+            all_results = list(executor.map(
+                lambda retriever: retriever._retrieve(query_bundle),
+                self._retrievers
+            ))
+        
+        for i, results in enumerate(all_results):
+            logger.info(f"   Retriever {i+1}/{len(self._retrievers)} found {len(results)} results")
         
         # Fuse results
         logger.info("🔀 Fusing results with RRF...")
@@ -185,6 +217,20 @@ class HybridRetriever(BaseRetriever):
         
         logger.info(f"✅ Hybrid retrieval complete: {len(fused)} final results")
         return fused
+    
+    
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        """
+        Async version of _retrieve
+        
+        WHY? Async callers (aretrieve / async query engines) can
+        await all retrievers together without extra threads
+        """
+        all_results = await asyncio.gather(*[
+            retriever._aretrieve(query_bundle)
+            for retriever in self._retrievers
+        ])
+        return self._reciprocal_rank_fusion(list(all_results))
 
 
 def demo_hybrid():
@@ -0,0 +1,128 @@
+"""
+Semantic Answer Cache
+
+WHY THIS EXISTS:
+- Every question runs the full pipeline: search + LLM answer
+- Users often re-ask the same thing in slightly different words
+  ("What is RAG?" / "what's RAG")
+- If a past question means the same thing, its answer can be reused,
+  skipping both the search and the (slow, paid) LLM call
+
+HOW IT WORKS:
+- Each answered question's embedding is kept (unit length)
+- A new question is compared to all of them (cosine similarity)
+- Similarity ≥ threshold → return the stored answer
+"""
+
+from typing import Any, List, Optional
+import logging
+import threading
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# How similar two questions must be to share an answer
+# WHY 0.95? Paraphrases score above it, related-but-different questions below
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+# How many past questions to remember
+# WHY 1024? One matrix-vector product over 1024 rows is well under 1 ms
+SEMANTIC_CACHE_SIZE = 1024
+
+
+class SemanticCache:
+    """
+    Maps question embeddings to stored answers
+    
+    WHY A NUMPY MATRIX (NOT FAISS)?
+    - A few thousand rows are searched exactly in microseconds
+    - Oldest entries are overwritten in place (ring buffer),
+      which a flat FAISS index can't do
+    """
+    
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_size: int = SEMANTIC_CACHE_SIZE
+    ):
+        """
+        Initialize cache
+        
+        Parameters:
+        - threshold: Minimum cosine similarity for a hit
+        - max_size: Entries kept before the oldest is replaced
+        """
+        self.threshold = threshold
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self.clear()
+    
+    
+    def clear(self):
+        """
+        Forget every stored answer
+        
+        WHY? Answers depend on the index and engine settings
+        """
+        with self._lock:
+            self._embeddings: Optional[np.ndarray] = None  # Created on first add
+            self._values: List[Any] = []
+            self._next = 0  # Slot the next entry goes into
+    
+    
+    def __len__(self) -> int:
+        return len(self._values)
+    
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[np.ndarray]:
+        """
+        Unit-length float32 copy (None for an all-zero vector)
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+    
+    
+    def get(self, embedding: List[float]) -> Optional[Any]:
+        """
+        Stored value for the most similar past question, if close enough
+        
+        Returns: The value, or None on a miss
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            if query is None or not self._values or len(query) != self._embeddings.shape[1]:
+                return None
+            
+            # Cosine similarity with every stored question at once
+            similarities = self._embeddings[:len(self._values)] @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            
+            logger.info(f"♻️  Semantic cache hit (similarity {similarities[best]:.3f})")
+            return self._values[best]
+    
+    
+    def add(self, embedding: List[float], value: Any):
+        """
+        Remember a value for this question embedding
+        """
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        
+        with self._lock:
+            if self._embeddings is None or self._embeddings.shape[1] != len(vector):
+                self._embeddings = np.empty((self.max_size, len(vector)), dtype=np.float32)
+                self._values = []
+                self._next = 0
+            
+            self._embeddings[self._next] = vector
+            if self._next < len(self._values):
+                self._values[self._next] = value
+            else:
+                self._values.append(value)
+            self._next = (self._next + 1) % self.max_size
@@ -0,0 +1,93 @@
+"""
+Fast JSON for Saved Indexes
+
+WHY THIS EXISTS:
+- LlamaIndex saves the docstore (every chunk's text + metadata)
+  and index store as JSON using Python's json module
+- For thousands of chunks, writing and reading that JSON is
+  pure-Python CPU work on every persist / load
+
+HOW IT WORKS:
+- If orjson (C implementation) is installed, LlamaIndex's
+  key-value store is pointed at it instead of json
+- Files stay plain JSON, so indexes saved either way load either way
+- Data holding NaN / Infinity is written and read with json instead
+  (orjson would turn those into null)
+- Optional: nothing changes when orjson is not installed
+"""
+
+import json
+import logging
+import math
+from llama_index.core.storage.kvstore import simple_kvstore
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _has_non_finite(obj) -> bool:
+    """
+    Does obj contain a NaN or ±Infinity float anywhere?
+    
+    WHY? orjson writes those as null, so the value would change on save
+    """
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif isinstance(item, float) and not math.isfinite(item):
+            return True
+    return False
+
+
+class _OrjsonModule:
+    """
+    The two json functions SimpleKVStore uses, backed by orjson
+    
+    WHY OPT_NON_STR_KEYS? json.dumps accepts int keys, orjson
+    rejects them unless asked
+    """
+    
+    @staticmethod
+    def dumps(obj, **kwargs) -> str:
+        # WHY json HERE? Keeps NaN / Infinity exactly as json always did
+        if _has_non_finite(obj):
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    
+    @staticmethod
+    def load(f, **kwargs):
+        data = f.read()
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # WHY? Files with NaN / Infinity are valid for json, not orjson
+            return json.loads(data, **kwargs)
+
+
+def enable_fast_storage_json() -> bool:
+    """
+    Make LlamaIndex's docstore / index store use orjson
+    
+    WHY A FUNCTION (NOT AT IMPORT)?
+    - Patching a library is a side effect; callers opt in
+    - Safe to call many times
+    
+    Returns: True if orjson is now in use
+    """
+    if not ORJSON_AVAILABLE:
+        return False
+    
+    if simple_kvstore.json is not _OrjsonModule:
+        simple_kvstore.json = _OrjsonModule
+        logger.info("⚡ Using orjson for index storage")
+    return True
@@ -26,36 +26,85 @@ WHY THIS EXISTS:
 
 import os
 from dotenv import load_dotenv
-
-# Load environment variables FIRST
-# WHY? OpenAI library needs API key before making any calls
-load_dotenv()
-
-# Verify API key exists
-# WHY? Better error message than cryptic authentication error
-if not os.getenv("OPENAI_API_KEY"):
-    raise ValueError(
-        "❌ OPENAI_API_KEY not found!\n"
-        "Please check your .env file contains:\n"
-        "OPENAI_API_KEY=sk-your-key-here"
-    )
-
-from typing import List, Optional
-from llama_index import (
+from typing import Dict, List, Optional, Tuple
+from llama_index.core import (
     VectorStoreIndex,
     StorageContext,
     load_index_from_storage,
     Settings
 )
-from llama_index.core.schema import Document
+from llama_index.core.schema import Document, QueryBundle
 from llama_index.llms.openai import OpenAI
-from llama_index.embeddings.openai import OpenAIEmbedding
 from pathlib import Path
 import logging
 
+# (project root added only when run as a script)
+import sys
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.retrieval.embedding_cache import CachedOpenAIEmbedding
+from src.retrieval.storage_json import enable_fast_storage_json
+from src.retrieval.semantic_cache import SemanticCache
+from src.retrieval.faiss_store import (
+    LazyFaissVectorStore,
+    FAISS_AVAILABLE,
+    FAISS_MARKER_FILE,
+    faiss_insert_batch_size
+)
+
+# Local embeddings (optional dependency)
+# WHY OPTIONAL? sentence-transformers + torch are a heavy install
+try:
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    HUGGINGFACE_AVAILABLE = True
+except ImportError:
+    HUGGINGFACE_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Model used when embedding_backend="local"
+# WHY MiniLM? 384-dim vectors, fast on CPU, no API cost or rate limits
+LOCAL_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Chunks per forward pass for the local model
+# WHY 64? Fills the CPU/GPU without blowing up memory
+LOCAL_EMBED_BATCH_SIZE = 64
+
+# Has .env been read yet? (only needed once per process)
+_dotenv_loaded = False
+
+# Loaded indexes, shared by every manager in this process
+# storage dir → (docstore mtime, embedding model, index)
+# WHY? Web apps build a manager per request; loading from disk each
+# time re-reads and re-parses every JSON file
+_index_cache: Dict[str, Tuple[int, str, VectorStoreIndex]] = {}
+
+
+def _ensure_openai_key():
+    """
+    Load .env and make sure the OpenAI API key is set
+    
+    WHY HERE AND NOT AT IMPORT?
+    - Importing the module (tools, other retrievers) shouldn't need a key
+    - .env is read once, the first time a manager is created
+    """
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        # WHY override=False? Real environment variables win over .env
+        load_dotenv(override=False)
+        _dotenv_loaded = True
+    
+    # Verify API key exists
+    # WHY? Better error message than cryptic authentication error
+    if not os.getenv("OPENAI_API_KEY"):
+        raise ValueError(
+            "❌ OPENAI_API_KEY not found!\n"
+            "Please check your .env file contains:\n"
+            "OPENAI_API_KEY=sk-your-key-here"
+        )
+
 
 class VectorIndexManager:
     """
@@ -79,7 +128,11 @@ class VectorIndexManager:
         storage_dir: str = "storage",
         model: str = "gpt-3.5-turbo",
         embedding_model: str = "text-embedding-ada-002",
-        temperature: float = 0.1
+        temperature: float = 0.1,
+        embed_batch_size: int = 256,
+        faiss_index_type: Optional[str] = "hnsw",
+        embedding_backend: str = "openai",
+        semantic_cache_threshold: Optional[float] = None
     ):
         """
         Initialize the vector index manager
@@ -93,9 +146,31 @@ class VectorIndexManager:
           WHY? text-embedding-ada-002 is OpenAI's best embedding model
         - temperature: Randomness (0=deterministic, 1=creative)
           WHY? Low temperature (0.1) for factual answers
+        - embed_batch_size: Chunks sent per embedding request
+          WHY? 1000 chunks = 4 HTTP round trips instead of 100
+        - faiss_index_type: FAISS index for new indexes ("hnsw", "ivfpq", "sq8", "fp16", "flat_fp16")
+          WHY? Sub-linear search instead of comparing every vector
+          (None, or faiss not installed = LlamaIndex's default store)
+        - embedding_backend: "openai" (default) or "local"
+          WHY LOCAL? Index builds become CPU-bound instead of waiting
+          on the API, and 384-dim vectors are 4x smaller than ada-002's
+          NOTE: Questions must use the same model as the index,
+          so switching backends means rebuilding the index
+        - semantic_cache_threshold: Reuse an earlier answer when a question
+          is at least this similar to one already asked (default None = off)
+          WHY? Paraphrased repeats skip the search and the LLM call
+          WHY OFF BY DEFAULT? Questions differing in one entity ("CEO" vs
+          "CTO") can score above 0.95 and would get the wrong answer
         """
+        # WHY FIRST? OpenAI clients need the API key before any calls
+        _ensure_openai_key()
+        
+        # WHY? Loading/saving the docstore JSON is faster with orjson
+        enable_fast_storage_json()
+        
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(exist_ok=True)
+        self.faiss_index_type = faiss_index_type if FAISS_AVAILABLE else None
         
         # Configure LlamaIndex settings globally
         # WHY GLOBAL? Applied to all operations (indexing, querying)
@@ -103,17 +178,38 @@ class VectorIndexManager:
             model=model,
             temperature=temperature
         )
-        Settings.embed_model = OpenAIEmbedding(
-            model=embedding_model
-        )
+        if embedding_backend == "local":
+            if not HUGGINGFACE_AVAILABLE:
+                raise ImportError(
+                    "❌ embedding_backend='local' needs llama-index-embeddings-huggingface\n"
+                    "Install with: pip install llama-index-embeddings-huggingface"
+                )
+            embedding_model = LOCAL_EMBEDDING_MODEL
+            Settings.embed_model = HuggingFaceEmbedding(
+                model_name=embedding_model,
+                embed_batch_size=LOCAL_EMBED_BATCH_SIZE
+            )
+        elif embedding_backend == "openai":
+            # WHY CACHED? Chunks embedded on an earlier run are read from disk
+            Settings.embed_model = CachedOpenAIEmbedding(
+                model=embedding_model,
+                embed_batch_size=embed_batch_size
+            )
+        else:
+            raise ValueError(f"Unknown embedding_backend: {embedding_backend}")
         
         self.index = None
         self.query_engine = None
+        self.semantic_cache = (
+            SemanticCache(threshold=semantic_cache_threshold)
+            if semantic_cache_threshold is not None else None
+        )
         
         logger.info(f"🎯 Vector Index Manager initialized")
         logger.info(f"   • Storage: {storage_dir}")
         logger.info(f"   • LLM: {model}")
         logger.info(f"   • Embeddings: {embedding_model}")
+        logger.info(f"   • Vector store: {f'FAISS ({self.faiss_index_type})' if self.faiss_index_type else 'default'}")
     
     
     def create_index(
@@ -151,10 +247,20 @@ class VectorIndexManager:
         logger.info(f"🔨 Creating vector index from {len(documents)} documents...")
         logger.info(f"⏳ This will take ~{len(documents) * 0.5:.0f} seconds...")
         
+        # FAISS store (built on first insert, once the dimension is known)
+        # WHY? Graph search instead of comparing every stored vector
+        vector_store = None
+        if self.faiss_index_type:
+            logger.info(f"🧱 Using FAISS ({self.faiss_index_type}) vector store")
+            vector_store = LazyFaissVectorStore(index_type=self.faiss_index_type)
+        
         # Create the index
         # WHY VectorStoreIndex? It handles embeddings + FAISS automatically
         self.index = VectorStoreIndex.from_documents(
             documents,
+            storage_context=StorageContext.from_defaults(vector_store=vector_store),
+            # WHY? Trained FAISS indexes must see the whole corpus at once
+            insert_batch_size=faiss_insert_batch_size(self.faiss_index_type),
             show_progress=True  # WHY? User feedback for long operations
         )
         
@@ -164,7 +270,14 @@ class VectorIndexManager:
             self.index.storage_context.persist(
                 persist_dir=str(self.storage_dir)
             )
+            
+            # WHY MARKER? load_index must know the vectors are FAISS
+            if self.faiss_index_type:
+                (self.storage_dir / FAISS_MARKER_FILE).write_text(self.faiss_index_type)
             logger.info(f"💾 Index saved to {self.storage_dir}")
+            
+            # WHY? The next load_index in this process can reuse it
+            self._cache_index()
         
         logger.info(f"✅ Index created successfully!")
         return self.index
@@ -192,21 +305,54 @@ class VectorIndexManager:
                 f"Create one first with create_index()"
             )
         
+        # Already loaded (and unchanged on disk)? Reuse it
+        cached = _index_cache.get(str(self.storage_dir.resolve()))
+        if cached is not None and cached[:2] == self._index_cache_stamp():
+            self.index = cached[2]
+            logger.info(f"♻️  Reusing loaded index from {self.storage_dir}")
+            return self.index
+        
         logger.info(f"📂 Loading index from {self.storage_dir}...")
         
+        # Saved with FAISS? Then the vector file is a FAISS index
+        vector_store = None
+        if (self.storage_dir / FAISS_MARKER_FILE).exists():
+            vector_store = LazyFaissVectorStore.from_persist_dir(str(self.storage_dir))
+        
         # Load the storage context
         # WHY? Contains index + metadata + embeddings
         storage_context = StorageContext.from_defaults(
-            persist_dir=str(self.storage_dir)
+            persist_dir=str(self.storage_dir),
+            vector_store=vector_store
         )
         
         # Load the index
         self.index = load_index_from_storage(storage_context)
+        self._cache_index()
         
         logger.info(f"✅ Index loaded successfully!")
         return self.index
     
     
+    def _index_cache_stamp(self) -> Tuple[int, str]:
+        """
+        What a cached index must match to be reused
+        
+        WHY BOTH?
+        - mtime: the index was rebuilt on disk → reload it
+        - embedding model: questions must be embedded like the chunks
+        """
+        mtime = (self.storage_dir / "docstore.json").stat().st_mtime_ns
+        return mtime, getattr(Settings.embed_model, "model_name", "")
+    
+    
+    def _cache_index(self):
+        """
+        Remember self.index for other managers on the same storage dir
+        """
+        _index_cache[str(self.storage_dir.resolve())] = (*self._index_cache_stamp(), self.index)
+    
+    
     def get_or_create_index(
         self,
         documents: Optional[List[Document]] = None
@@ -248,7 +394,8 @@ class VectorIndexManager:
     def create_query_engine(
         self,
         similarity_top_k: int = 3,
-        response_mode: str = "compact"
+        response_mode: str = "compact",
+        nprobe: Optional[int] = None
     ):
         """
         Create query engine for asking questions
@@ -267,6 +414,8 @@ class VectorIndexManager:
         - response_mode: How to combine retrieved docs (default "compact")
           WHY "compact"? Efficiently combines multiple chunks
           Options: "compact", "tree_summarize", "simple_summarize"
+        - nprobe: IVF clusters searched per query (ivfpq indexes only)
+          WHY? Higher = better recall, lower = faster (None = keep default)
         
         Returns: Query engine
         """
@@ -279,6 +428,12 @@ class VectorIndexManager:
         logger.info(f"   • Retrieving top {similarity_top_k} documents")
         logger.info(f"   • Response mode: {response_mode}")
         
+        # WHY? HNSW needs a wider search to return more results
+        if isinstance(self.index.vector_store, LazyFaissVectorStore):
+            self.index.vector_store.set_top_k(similarity_top_k)
+            if nprobe:
+                self.index.vector_store.set_nprobe(nprobe)
+        
         # Create query engine
         # WHY as_query_engine? Convenience method that sets up everything
         self.query_engine = self.index.as_query_engine(
@@ -286,6 +441,10 @@ class VectorIndexManager:
             response_mode=response_mode
         )
         
+        # WHY? Stored answers came from the previous index / settings
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+        
         logger.info(f"✅ Query engine ready!")
         return self.query_engine
     
@@ -321,9 +480,21 @@ class VectorIndexManager:
         if verbose:
             logger.info(f"❓ Question: {question}")
         
+        # Asked (in other words) before? Reuse that answer
+        question_embedding = None
+        if self.semantic_cache is not None:
+            question_embedding = Settings.embed_model.get_query_embedding(question)
+            cached = self.semantic_cache.get(question_embedding)
+            if cached is not None:
+                return {**cached, 'question': question}
+        
         # Query the engine
         # WHY .query()? Runs the entire RAG pipeline
-        response = self.query_engine.query(question)
+        # WHY QueryBundle? Hands over the embedding computed above,
+        # so the question isn't embedded a second time
+        response = self.query_engine.query(
+            QueryBundle(query_str=question, embedding=question_embedding)
+        )
         
         # Extract information
         # WHY? User wants answer + sources for verification
@@ -333,6 +504,9 @@ class VectorIndexManager:
             'source_nodes': response.source_nodes if hasattr(response, 'source_nodes') else []
         }
         
+        if question_embedding is not None:
+            self.semantic_cache.add(question_embedding, result)
+        
         if verbose:
             logger.info(f"✅ Answer: {result['answer'][:200]}...")
             logger.info(f"📚 Used {len(result['source_nodes'])} source(s)")